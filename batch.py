@@ -0,0 +1,173 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import json
+from itertools import islice
+
+import validators
+from validators import PhoneNormalizer, normalize_phone, parse_birthday
+
+# csv columns; phones in one cell are separated by ';' (or ','), spaces are part of a number
+# ('+38 (050) 123-45-67'), birthday is 'dd-mm-yyyy'
+csv_fields = ("name", "phone", "birthday")
+phone_separator = "; "
+
+
+def file_format(file_name: str) -> str:
+    if file_name.lower().endswith(".csv"):
+        return "csv"
+    if file_name.lower().endswith((".jsonl", ".json")):
+        return "jsonl"
+    raise ValueError(f"Unknown format of file '{file_name}'. Please use '.csv' or '.jsonl' file.")
+
+
+def read_rows(file_name: str):
+    # yields (line number, row dict) without reading the whole file
+    with open(file_name, "r", encoding="utf-8", newline="") as file:
+        if file_format(file_name) == "csv":
+            for line_number, row in enumerate(csv.DictReader(file), start=2):
+                yield line_number, row
+        else:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError:
+                    yield line_number, {"raw": line.rstrip("\n")}
+
+
+def row_phones(row) -> list:
+    if not isinstance(row, dict):
+        return []
+    phones = row.get("phone") or []
+    if isinstance(phones, str):
+        return [phone for phone in phones.replace(",", ";").split(";") if phone.strip()]
+    if not isinstance(phones, list):
+        # a number or other value of jsonl row is one phone
+        return [str(phones)]
+    return [str(phone) for phone in phones]
+
+
+def validate_row(row: dict, normalized: dict = None, phones: list = None) -> tuple[dict | None, str | None]:
+    # the same rules as Phone.value and Birthday.value, returns state for Record.from_dict or error;
+    # normalized could give already normalized phones of the row and phones its row_phones;
+    # a row that could not be checked at all is rejected too, so it goes to error file with others
+    try:
+        return row_state(row, normalized, phones)
+    except Exception as e:
+        return None, f"row could not be read: {e}"
+
+
+def row_state(row: dict, normalized: dict = None, phones: list = None) -> tuple[dict | None, str | None]:
+    if not isinstance(row, dict):
+        return None, "row is not an object"
+    name = str(row.get("name") or "").strip()
+    if len(name) == 0 or " " in name:
+        return None, f"incorrect name '{name}'"
+    if phones is None:
+        phones = row_phones(row)
+    if len(phones) == 0:
+        return None, "contact has no phone"
+    normalized_phones = []
+    for phone in phones:
+        phone_number = normalized[phone] if normalized is not None else normalize_phone(phone)
+        if phone_number is None:
+            return None, f"'{phone}' is not a phone number"
+        if "+" + phone_number not in normalized_phones:
+            normalized_phones.append("+" + phone_number)
+    birthday = row.get("birthday") or None
+    if birthday is not None:
+        try:
+            birthday = parse_birthday(str(birthday).strip()).isoformat()
+        except ValueError:
+            return None, f"'{birthday}' is not correct date"
+    return {"name": name.lower().capitalize(), "phone": normalized_phones, "birthday": birthday}, None
+
+
+def validate_chunk(chunk: list, plans: dict = None) -> list:
+    # phones of the whole chunk are normalized in one batch; plans are passed to worker processes,
+    # which do not see validators.set_phone_plans of the main process
+    normalizer = PhoneNormalizer(plans) if plans is not None else validators.phone_normalizer
+    phones = []
+    for _, row in chunk:
+        try:
+            phones.append(row_phones(row))
+        except Exception:
+            # the row is rejected by validate_row
+            phones.append(None)
+    numbers = [phone for row in phones if row is not None for phone in row]
+    normalized = dict(zip(numbers, normalizer.normalize_many(numbers)))
+    return [(line_number, row, *validate_row(row, normalized, numbers))
+            for (line_number, row), numbers in zip(chunk, phones)]
+
+
+def chunked(rows, chunk_size: int):
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def validated_chunks(rows, workers: int = 1, chunk_size: int = 1000):
+    if workers <= 1:
+        yield from map(validate_chunk, chunked(rows, chunk_size))
+        return
+    # keeps only a few chunks in flight, so input is never loaded as a whole
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunked(rows, chunk_size):
+            pending.append(executor.submit(validate_chunk, chunk, validators.phone_normalizer.plans))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def import_contacts(book, file_name: str, errors_file: str = None, workers: int = 1, chunk_size: int = 1000):
+    errors_file = errors_file or file_name + ".errors.jsonl"
+    imported = rejected = 0
+    errors = None
+    try:
+        for chunk in validated_chunks(read_rows(file_name), workers=workers, chunk_size=chunk_size):
+            with book.bulk():
+                for line_number, row, state, error in chunk:
+                    if error is None:
+                        try:
+                            book.merge_contact(state)
+                            imported += 1
+                            continue
+                        except ValueError as e:
+                            error = str(e)
+                    if errors is None:
+                        errors = open(errors_file, "w", encoding="utf-8")
+                    error_entry = {"line": line_number, "error": error, "row": row}
+                    errors.write(json.dumps(error_entry, ensure_ascii=False) + "\n")
+                    rejected += 1
+    finally:
+        if errors is not None:
+            errors.close()
+    return imported, rejected, errors_file
+
+
+def export_contacts(book, file_name: str) -> int:
+    exported = 0
+    with open(file_name, "w", encoding="utf-8", newline="") as file:
+        if file_format(file_name) == "csv":
+            writer = csv.DictWriter(file, fieldnames=csv_fields)
+            writer.writeheader()
+        else:
+            writer = None
+        for record in book.data.values():
+            birthday = record.birthday.value if record.birthday is not None else None
+            row = {
+                "name": record.name.value,
+                "phone": [phone.value for phone in record.phone if phone.value is not None],
+                "birthday": birthday.strftime("%d-%m-%Y") if birthday is not None else None,
+            }
+            if writer is not None:
+                writer.writerow({**row, "phone": phone_separator.join(row["phone"]),
+                                 "birthday": row["birthday"] or ""})
+            else:
+                file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            exported += 1
+    return exported
@@ -0,0 +1,62 @@
+# synthetic phonebook with Ukrainian names (national transliteration), mobile numbers of Ukrainian operators
+# and birthdays; the same seed always gives the same contacts
+from datetime import date
+import random
+
+from main import Birthday, Name, Phone, Record
+
+first_names = [
+    "Andrii", "Oleksandr", "Oleksii", "Anatolii", "Bohdan", "Vasyl", "Viktor", "Volodymyr", "Vitalii", "Halyna",
+    "Hryhorii", "Dmytro", "Denys", "Yevhen", "Ivan", "Ihor", "Yurii", "Kostiantyn", "Maksym", "Mykhailo",
+    "Mykola", "Myroslav", "Nazar", "Oleh", "Ostap", "Pavlo", "Petro", "Roman", "Serhii", "Stanislav",
+    "Stepan", "Taras", "Fedir", "Yaroslav", "Artem", "Valentyn", "Vadym", "Danylo", "Illia", "Zakhar",
+    "Alla", "Anastasiia", "Anna", "Valentyna", "Viktoriia", "Daryna", "Yevheniia", "Kateryna", "Iryna", "Khrystyna",
+    "Larysa", "Liudmyla", "Mariia", "Maryna", "Nadiia", "Natalia", "Oksana", "Olena", "Olha", "Polina",
+    "Sofiia", "Svitlana", "Solomiia", "Tetiana", "Uliana", "Yuliia", "Yana", "Zoriana", "Liliia", "Vira",
+]
+
+surnames = [
+    "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko", "Shevchenko", "Boiko", "Kovalchuk", "Koval",
+    "Oliinyk", "Shevchuk", "Polishchuk", "Tkachuk", "Savchenko", "Bondar", "Marchenko", "Rudenko", "Moroz",
+    "Lysenko", "Petrenko", "Klymenko", "Pavlenko", "Savchuk", "Kravets", "Kuzmenko", "Ponomarenko", "Levchenko",
+    "Kharchenko", "Karpenko", "Vasylenko", "Melnyk", "Kushnir", "Sydorenko", "Moskalenko", "Kostenko", "Panchenko",
+    "Kolomiiets", "Khomenko", "Fedorenko", "Ivanenko", "Nazarenko", "Havryliuk", "Ostapenko", "Hrytsenko",
+    "Yurchenko", "Romaniuk", "Demchenko", "Holub", "Lytvynenko", "Ishchenko", "Martyniuk", "Kuzmych", "Hnatiuk",
+    "Mazur", "Voloshyn", "Zinchenko", "Stepanenko", "Prokopenko", "Horbunov", "Dmytrenko", "Lytvyn", "Semeniuk",
+    "Prykhodko", "Mykhailenko", "Kozak", "Chernenko", "Vlasenko", "Kucher", "Yakovenko", "Babenko", "Herasymenko",
+    "Humeniuk", "Ruban", "Zaiets", "Hrebeniuk", "Vakulenko", "Denysenko", "Taranenko", "Stetsenko", "Tymoshenko",
+    "Hordiienko", "Sokolenko", "Pylypenko", "Yaremchuk", "Chumak", "Dovzhenko", "Zakharchenko", "Kyrylenko",
+]
+
+operator_codes = ["50", "63", "66", "67", "68", "73", "93", "95", "96", "97", "98", "99"]
+
+
+def synthetic_contacts(count: int, seed: int = 0) -> list[tuple[str, list, date | None]]:
+    # (name, phones, birthday); names are unique and already normalized like in the book ('Andrii_kovalenko')
+    generator = random.Random(seed)
+    first_day = date(1950, 1, 1).toordinal()
+    taken = {}
+    contacts = []
+    for _ in range(count):
+        name = f"{generator.choice(first_names)}_{generator.choice(surnames)}".capitalize()
+        taken[name] = taken.get(name, 0) + 1
+        if taken[name] > 1:
+            name = f"{name}{taken[name]}"
+        phones = [
+            f"+380{generator.choice(operator_codes)}{generator.randrange(10_000_000):07d}"
+            for _ in range(1 if generator.random() < 0.8 else 2)
+        ]
+        birthday = date.fromordinal(first_day + generator.randrange(22_000)) if generator.random() < 0.8 else None
+        contacts.append((name, phones, birthday))
+    return contacts
+
+
+def synthetic_records(count: int, seed: int = 0) -> dict:
+    records = {}
+    for name, phones, birthday in synthetic_contacts(count, seed):
+        record = Record(Name.from_value(name))
+        record.phone = [Phone.from_value(phone) for phone in phones]
+        if birthday is not None:
+            record.birthday = Birthday.from_value(birthday)
+        records[name] = record
+    return records
@@ -0,0 +1,47 @@
+# duplicate search over synthetic book with injected duplicates: time, comparisons per contact and found groups
+# usage: python -m benchmarks.dedupe [count ...]
+import random
+import sys
+import time
+
+from benchmarks.contacts import synthetic_records
+from dedupe import find_duplicates
+from main import AddressBook, Name, Phone, Record
+
+
+def with_duplicates(count: int, share: float = 0.01, seed: int = 0) -> tuple[dict, int]:
+    # every duplicate has the name of original with words swapped or one letter changed and one phone of it
+    generator = random.Random(seed)
+    records = synthetic_records(count, seed)
+    duplicates = 0
+    for key in generator.sample(list(records), int(count * share)):
+        first, _, last = key.partition("_")
+        if generator.random() < 0.5:
+            name = f"{last.capitalize()}_{first.lower()}"
+        else:
+            position = generator.randrange(1, len(key))
+            name = key[:position] + generator.choice("aeiouy") + key[position + 1:]
+        if name in records:
+            continue
+        duplicate = Record(Name.from_value(name), Phone.from_value(records[key].phone[0]._value))
+        records[name] = duplicate
+        duplicates += 1
+    return records, duplicates
+
+
+def main(counts):
+    for count in counts:
+        records, duplicates = with_duplicates(count)
+        book = AddressBook(journal=False, history=0)
+        book.data.update(records)
+        started = time.perf_counter()
+        report = find_duplicates(book)
+        seconds = time.perf_counter() - started
+        found = sum(len(group) - 1 for group in report.groups)
+        print(f"{len(records):>9,} contacts: {seconds:7.2f} s, {report.comparisons / len(records):.1f} comparisons "
+              f"per contact, {found:,} duplicates found of {duplicates:,} injected, "
+              f"{report.skipped_blocks} blocks skipped")
+
+
+if __name__ == "__main__":
+    main([int(count) for count in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
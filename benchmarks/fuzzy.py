@@ -0,0 +1,52 @@
+# FuzzyIndex: build time and query time with typos against linear scan with edit_distance
+# usage: python -m benchmarks.fuzzy [count]
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+from indexes import FuzzyIndex, edit_distance, letter_masks, phonetic_key
+
+syllables = ["an", "dri", "ko", "va", "len", "ser", "hi", "ta", "ras", "ol", "ena", "myk", "hai", "lo", "pe",
+             "tro", "yu", "ri", "bo", "hdan", "mar", "ia", "sta", "nis", "lav", "vo", "lo", "dy", "myr", "chuk"]
+
+
+def synthetic_names(count: int, seed: int = 0) -> list:
+    generator = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        names.add("".join(generator.choice(syllables) for _ in range(generator.randint(2, 4))).capitalize())
+    return sorted(names)
+
+
+def with_typo(name: str, generator: random.Random) -> str:
+    position = generator.randrange(len(name))
+    return name[:position] + generator.choice("aeiouy") + name[position + 1:]
+
+
+def main(count: int):
+    names = synthetic_names(count)
+    index = FuzzyIndex()
+    started = time.perf_counter()
+    for name in names:
+        index.add(name, SimpleNamespace(name=SimpleNamespace(value=name)))
+    print(f"{count} names indexed in {time.perf_counter() - started:.2f} s")
+
+    generator = random.Random(1)
+    queries = [with_typo(name, generator) for name in generator.sample(names, 1000)]
+    started = time.perf_counter()
+    for query in queries:
+        index.search(query)
+    print(f"search: {(time.perf_counter() - started) / len(queries) * 1000:.3f} ms per query")
+
+    keys = [phonetic_key(name) for name in names]
+    started = time.perf_counter()
+    for query in queries[:10]:
+        query_key = phonetic_key(query)
+        masks = letter_masks(query_key)
+        [key for key in keys if edit_distance(query_key, key, masks) <= FuzzyIndex.max_distance]
+    print(f"linear scan: {(time.perf_counter() - started) / 10 * 1000:.3f} ms per query")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,63 @@
+# bytes per contact of the old __dict__ based fields vs slotted fields with packed values
+# usage: python -m benchmarks.memory [count ...]
+from datetime import date
+import gc
+import sys
+import tracemalloc
+
+from main import Birthday, Name, Phone, Record
+
+
+class LegacyField:
+    def __init__(self, value):
+        self._value = value
+
+
+class LegacyRecord:
+    def __init__(self, name, phone, birthday):
+        self._book = None
+        self.name = name
+        self.phone = [phone]
+        self.birthday = birthday
+
+
+def legacy_contact(number: int):
+    return LegacyRecord(
+        LegacyField(f"Contact{number}"),
+        LegacyField(f"+380{500000000 + number}"),
+        LegacyField(date.fromordinal(date(1970, 1, 1).toordinal() + number % 15000)),
+    )
+
+
+def compact_contact(number: int):
+    return Record(
+        Name.from_value(f"Contact{number}"),
+        Phone.from_value(f"+380{500000000 + number}"),
+        Birthday.from_value(date.fromordinal(date(1970, 1, 1).toordinal() + number % 15000)),
+    )
+
+
+def bytes_per_contact(factory, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    contacts = {}
+    for number in range(count):
+        contact = factory(number)
+        contacts[contact.name._value] = contact
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del contacts
+    gc.collect()
+    return used / count
+
+
+def main(counts):
+    print(f"{'contacts':>10} {'before, B':>10} {'after, B':>10} {'saved':>7}")
+    for count in counts:
+        before = bytes_per_contact(legacy_contact, count)
+        after = bytes_per_contact(compact_contact, count)
+        print(f"{count:>10} {before:>10.1f} {after:>10.1f} {1 - after / before:>7.1%}")
+
+
+if __name__ == "__main__":
+    main([int(count) for count in sys.argv[1:]] or [100_000, 1_000_000])
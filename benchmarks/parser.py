@@ -0,0 +1,44 @@
+# throughput of UserInputParser.parse_user_input on scripted input
+# usage: python -m benchmarks.parser [lines]
+import random
+import sys
+import time
+
+from main import UserInputParser
+
+script_templates = [
+    "add contact {name} +38(050){number} 01-02-1990",
+    "add phone {name} 380{number}",
+    "change phone {name} 380{number} 380{number}",
+    "delete phone {name} 380{number}",
+    "days to birthday {name}",
+    "upcoming birthdays 7",
+    "phone {name}",
+    "whois 380{number}",
+    "find {name}",
+    "show all",
+]
+
+
+def scripted_lines(count: int, seed: int = 0) -> list:
+    generator = random.Random(seed)
+    return [
+        generator.choice(script_templates).format(
+            name=f"Daniel{generator.randrange(10_000)}", number=generator.randrange(500_000_000, 999_999_999)
+        )
+        for _ in range(count)
+    ]
+
+
+def main(count: int):
+    parser = UserInputParser()
+    lines = scripted_lines(count)
+    started = time.perf_counter()
+    for line in lines:
+        parser.parse_user_input(line)
+    elapsed = time.perf_counter() - started
+    print(f"{count} lines parsed in {elapsed:.3f} s: {count / elapsed:,.0f} lines/sec")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,65 @@
+# throughput of phone normalization: the old function, PhoneNormalizer one by one and numpy batch, the whole
+# list at once and in chunks of import (batch.validate_chunk)
+# usage: python -m benchmarks.phones [count]
+import random
+import sys
+import time
+
+import validators
+from validators import PhoneNormalizer
+
+
+def replace_chain(number: str) -> str | None:
+    # normalization as it was done before PhoneNormalizer
+    phone_number = (
+        number.strip()
+        .removeprefix("+")
+        .replace("(", "")
+        .replace(")", "")
+        .replace("-", "")
+        .replace(" ", "")
+    )
+    if phone_number.isdigit() and phone_number.startswith("380") and len(phone_number) == 12:
+        return phone_number
+    return None
+
+
+def synthetic_numbers(count: int, seed: int = 0) -> list:
+    # numbers written in different ways, about every tenth of them is invalid
+    generator = random.Random(seed)
+    templates = ["+380{}{}", "380{}{}", "+38(0{}){}", "+38-0{}-{}", " +380 {} {} ", "380{}{}0"]
+    numbers = []
+    for _ in range(count):
+        code = generator.choice(["050", "067", "093", "097"])[1:]
+        numbers.append(generator.choice(templates).format(code, generator.randrange(1_000_000, 9_999_999)))
+    return numbers
+
+
+def throughput(function, numbers: list) -> float:
+    started = time.perf_counter()
+    function(numbers)
+    return len(numbers) / (time.perf_counter() - started)
+
+
+def main(count: int):
+    numbers = synthetic_numbers(count)
+    normalizer = PhoneNormalizer()
+    results = {
+        "str.replace chain": throughput(lambda items: [replace_chain(number) for number in items], numbers),
+        "normalize, one by one": throughput(lambda items: [normalizer.normalize(number) for number in items], numbers),
+    }
+    if validators.batch_numpy() is not None:
+        results["numpy batch"] = throughput(normalizer.normalize_many, numbers)
+        results["numpy batch, integers"] = throughput(normalizer.values, numbers)
+        results["numpy batch, by 1000"] = throughput(
+            lambda items: [normalizer.normalize_many(items[start:start + 1000]) for start in range(0, len(items), 1000)],
+            numbers,
+        )
+    else:
+        print("numpy is not installed, batch path is the same as one by one")
+    for name, numbers_per_second in results.items():
+        print(f"{name:>24}: {numbers_per_second:>14,.0f} numbers/sec")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,34 @@
+# output of 'show all' for the whole book: first run renders records, next runs take cached lines
+# usage: python -m benchmarks.render [count]
+import io
+import sys
+import time
+
+from benchmarks.storage import synthetic_records
+from main import AddressBook, CommandLineInterface, output_formats
+
+
+def show_all(cli: CommandLineInterface) -> float:
+    output = io.StringIO()
+    started = time.perf_counter()
+    for block in cli.show_all_handler():
+        output.write(block)
+    return time.perf_counter() - started
+
+
+def main(count: int):
+    records = synthetic_records(count)
+    for output_format in output_formats:
+        book = AddressBook(journal=False)
+        book.data.update(records)
+        cli = CommandLineInterface(answer="yes", output_format=output_format)
+        cli.setup_book(book)
+        first = show_all(cli)
+        repeated = min(show_all(cli) for _ in range(3))
+        print(f"{output_format:>6}: first 'show all' {first:.3f} s, repeated {repeated:.3f} s")
+        for record in records.values():
+            record._rendered = None
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,118 @@
+# load generator for server.py: latency percentiles and requests/sec with many concurrent connections
+# usage: python -m benchmarks.server_load [--connections N] [--requests N] [--contacts N] [--host H --port P]
+# without --port a server is started in a temporary directory and stopped at the end
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+server_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server.py")
+
+
+def next_command(generator: random.Random, contacts: int, write_share: float) -> str:
+    name = f"Contact{generator.randrange(contacts)}"
+    number = f"+380{generator.randrange(500_000_000, 999_999_999)}"
+    if generator.random() < write_share:
+        return generator.choice([f"add phone {name} {number}", f"add birthday {name} 01-02-1990"])
+    return generator.choice([
+        f"phone {name}",
+        f"find {name[3:]}",
+        f"whois {number}",
+        f"days to birthday {name}",
+        "upcoming birthdays 3",
+    ])
+
+
+async def request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, command: str) -> str:
+    writer.write((command + "\n").encode("utf-8"))
+    await writer.drain()
+    return json.loads(await reader.readline())["response"]
+
+
+async def populate(host: str, port: int, contacts: int):
+    reader, writer = await asyncio.open_connection(host, port)
+    for number in range(contacts):
+        await request(reader, writer, f"add contact Contact{number} +380{500_000_000 + number} 01-01-1990")
+    await request(reader, writer, "exit")
+    writer.close()
+
+
+async def client(host: str, port: int, requests: int, contacts: int, write_share: float, seed: int,
+                 latencies: list):
+    generator = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    for _ in range(requests):
+        command = next_command(generator, contacts, write_share)
+        started = time.perf_counter()
+        await request(reader, writer, command)
+        latencies.append(time.perf_counter() - started)
+    await request(reader, writer, "exit")
+    writer.close()
+
+
+def percentile(values: list, share: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def run_load(host: str, port: int, connections: int, requests: int, contacts: int, write_share: float):
+    await populate(host, port, contacts)
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(host, port, requests, contacts, write_share, seed, latencies) for seed in range(connections)
+    ))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(f"{connections} connections x {requests} requests ({write_share:.0%} writes), {contacts} contacts")
+    print(f"{len(latencies) / elapsed:,.0f} requests/sec, "
+          f"p50 {percentile(latencies, 0.5) * 1000:.2f} ms, p99 {percentile(latencies, 0.99) * 1000:.2f} ms")
+
+
+def start_server(directory: str, backend: str) -> tuple[subprocess.Popen, int]:
+    process = subprocess.Popen(
+        [sys.executable, server_file, "--port", "0", "--backend", backend],
+        cwd=directory, stdout=subprocess.PIPE, text=True,
+    )
+    for line in process.stdout:
+        if line.startswith("Phonebook is served on "):
+            port = int(line.strip().rsplit(":", 1)[1])
+            break
+    else:
+        raise RuntimeError("Server was not started")
+    # the rest of server output is read in background, so the server never blocks on a full pipe
+    threading.Thread(target=process.stdout.read, daemon=True).start()
+    return process, port
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for phonebook server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--connections", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=100, help="requests per connection")
+    parser.add_argument("--contacts", type=int, default=1000)
+    parser.add_argument("--write-share", type=float, default=0.1)
+    parser.add_argument("--backend", default="binary", help="storage of started server")
+    arguments = parser.parse_args(argv)
+    load = (arguments.connections, arguments.requests, arguments.contacts, arguments.write_share)
+    if arguments.port is not None:
+        asyncio.run(run_load(arguments.host, arguments.port, *load))
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        process, port = start_server(directory, arguments.backend)
+        try:
+            asyncio.run(run_load("127.0.0.1", port, *load))
+        finally:
+            process.send_signal(signal.SIGINT)
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
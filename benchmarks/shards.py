@@ -0,0 +1,89 @@
+# queries per second of scan-heavy queries of one book in this process against book sharded by worker processes:
+# answers only, then answers with all their records; sharded book is opened from the file of 'binary' storage
+# usage: python -m benchmarks.shards [count] [shards ...]
+from contextlib import redirect_stdout
+import gc
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+from benchmarks.contacts import first_names, surnames, synthetic_records
+from main import AddressBook
+from shards import ShardedStorage
+from storage import BinaryStorage
+
+
+def queries(generator: random.Random) -> dict:
+    # find by part of name or phone matches hundreds of contacts, upcoming birthdays walks a month of calendar
+    return {
+        "find name": [generator.choice(first_names + surnames)[:4].lower() for _ in range(50)],
+        "find phone": [f"{generator.randrange(1000):03d}" for _ in range(50)],
+        "upcoming birthdays 30": [date.fromordinal(date(2024, 1, 1).toordinal() + day)
+                                  for day in generator.sample(range(366), 20)],
+    }
+
+
+def run_queries(book: AddressBook, requests: dict, read: bool) -> dict:
+    # indexes are built by the first query of every kind, it is not counted
+    book.find_by_pattern("a")
+    book.upcoming_birthdays(30, date(2024, 1, 1))
+    results = {}
+    for kind, arguments in requests.items():
+        started = time.perf_counter()
+        for argument in arguments:
+            if kind == "upcoming birthdays 30":
+                answer = book.upcoming_birthdays(30, argument)
+            else:
+                answer = book.find_by_pattern(argument)
+            if read:
+                for _ in answer:
+                    pass
+        results[kind] = len(arguments) / (time.perf_counter() - started)
+    return results
+
+
+def main(count: int, shard_counts: list):
+    records = synthetic_records(count)
+    # records of the benchmark itself should not be walked by garbage collector of sharded queries
+    gc.freeze()
+    requests = queries(random.Random(1))
+    print(f"{count:,} contacts, {os.cpu_count()} processors, queries per second")
+
+    book = AddressBook(journal=False)
+    book.data.update(records)
+    for record in records.values():
+        record._book = book
+    for read in (False, True):
+        results = run_queries(book, requests, read)
+        print(f"{'in process':>12}{' read' if read else '':>5}: "
+              + ", ".join(f"{kind} {rate:,.1f}" for kind, rate in results.items()))
+
+    with tempfile.TemporaryDirectory() as directory:
+        current_directory = os.getcwd()
+        os.chdir(directory)
+        try:
+            BinaryStorage().write(records)
+            for shards in shard_counts:
+                ShardedStorage.shards = shards
+                book = AddressBook(journal=False, backend="sharded", read_only=True)
+                started = time.perf_counter()
+                with redirect_stdout(io.StringIO()):
+                    book.__enter__()
+                print(f"{shards:>5} shards: open {time.perf_counter() - started:.2f} s")
+                for read in (False, True):
+                    results = run_queries(book, requests, read)
+                    print(f"{shards:>5} shards{' read' if read else '':>5}: "
+                          + ", ".join(f"{kind} {rate:,.1f}" for kind, rate in results.items()))
+                with redirect_stdout(io.StringIO()):
+                    book.__exit__(None, None, None)
+        finally:
+            os.chdir(current_directory)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000,
+         [int(argument) for argument in sys.argv[2:]] or [1, 2, 4])
@@ -0,0 +1,60 @@
+# cold start of the assistant on a big book: import time of main module (python -X importtime) and wall clock
+# of one command from command line against the same command piped to script mode, every run is a new process
+# usage: python -m benchmarks.startup [count] [runs]
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.contacts import synthetic_records
+from storage import BinaryStorage
+
+package_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_time(directory: str) -> float:
+    # cumulative microseconds of 'main' from the last line of -X importtime report
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=directory,
+                            env={**os.environ, "PYTHONPATH": package_directory}, capture_output=True, text=True)
+    line = next(line for line in reversed(result.stderr.splitlines()) if line.rstrip().endswith("| main"))
+    return int(line.split("|")[1]) / 1_000_000
+
+
+def wall_clock(command: list, directory: str, runs: int, stdin: str = None) -> float:
+    # the best of runs, seconds
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, cwd=directory, input=stdin, capture_output=True, text=True, check=True)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(count: int, runs: int):
+    records = synthetic_records(count)
+    name = next(reversed(records))
+    main_script = os.path.join(package_directory, "main.py")
+    with tempfile.TemporaryDirectory() as directory:
+        current_directory = os.getcwd()
+        os.chdir(directory)
+        try:
+            BinaryStorage().write(records)
+        finally:
+            os.chdir(current_directory)
+        del records
+        results = {
+            "import main": import_time(directory),
+            "python -c pass": wall_clock([sys.executable, "-c", "pass"], directory, runs),
+            f"main.py phone {name}": wall_clock([sys.executable, main_script, "phone", name], directory, runs),
+            "script mode, the same command": wall_clock([sys.executable, main_script, "--autosave", "0"], directory,
+                                                        runs, stdin=f"phone {name}\n"),
+        }
+    print(f"{count:,} contacts, best of {runs} runs, seconds")
+    for path, seconds in results.items():
+        print(f"{path:>40}: {seconds:.3f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000, int(sys.argv[2]) if len(sys.argv) > 2 else 3)
@@ -0,0 +1,56 @@
+# binary vs pickle vs mapped vs sqlite storages: save, open and indexed queries
+# usage: python -m benchmarks.storage [count ...]
+from contextlib import redirect_stdout
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.contacts import synthetic_records
+from main import AddressBook
+from storage import storages
+
+
+def timed(function, repeat: int = 1) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+def measure(backend: str, records: dict) -> dict:
+    names = random.Random(1).sample(list(records), min(1000, len(records)))
+    results = {"save": timed(lambda: storages[backend]().write(records))}
+    book = AddressBook(journal=False, backend=backend)
+    with redirect_stdout(io.StringIO()):
+        results["open"] = timed(book.__enter__)
+        results["find_by_name"] = timed(lambda: [book.find_by_name(name) for name in names]) / len(names)
+        # parts of names of one or a few contacts
+        results["first find"] = timed(lambda: book.find_by_pattern(names[0][1:]))
+        results["find"] = timed(lambda: book.find_by_pattern(names[1][1:]), repeat=20)
+        results["upcoming 7 days"] = timed(lambda: book.upcoming_birthdays(7), repeat=5)
+        results["close"] = timed(lambda: book.__exit__(None, None, None))
+    results["file, MB"] = os.path.getsize(storages[backend].file_name) / 2 ** 20
+    return results
+
+
+def main(counts):
+    for count in counts:
+        records = synthetic_records(count)
+        with tempfile.TemporaryDirectory() as directory:
+            current_directory = os.getcwd()
+            os.chdir(directory)
+            try:
+                table = {backend: measure(backend, records) for backend in storages}
+            finally:
+                os.chdir(current_directory)
+        print(f"\n{count} contacts, seconds (find_by_name per call)")
+        print(f"{'':>16}" + "".join(f"{backend:>12}" for backend in table))
+        for metric in next(iter(table.values())):
+            print(f"{metric:>16}" + "".join(f"{table[backend][metric]:>12.6f}" for backend in table))
+
+
+if __name__ == "__main__":
+    main([int(count) for count in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,161 @@
+# benchmark suite of the phonebook hot paths, results are saved to json and could be checked against a baseline
+# usage: python -m benchmarks.suite [--sizes 1000 10000 100000 1000000] [--output results.json]
+#                                   [--baseline old.json] [--tolerance 0.25]
+# exit code is 1 when any path of the baseline became slower than the tolerance allows
+import argparse
+from contextlib import redirect_stdout
+from datetime import date
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.contacts import synthetic_contacts, synthetic_records
+from main import AddressBook, Birthday, CommandLineInterface, Name, Phone, UserInputParser
+
+
+def best_time(function, repeat: int = 3, number: int = 1) -> float:
+    # seconds per call, the best of repeats is the least disturbed by other processes
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = (time.perf_counter() - started) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def per_item(function, items: list, repeat: int = 5) -> float:
+    return best_time(lambda: [function(item) for item in items], repeat=repeat) / len(items)
+
+
+def command_lines(contacts: list, count: int, generator: random.Random) -> list:
+    lines = []
+    for _ in range(count):
+        name, phones, _ = generator.choice(contacts)
+        lines.append(generator.choice([
+            f"add contact {name} {phones[0]} 01-02-1990",
+            f"add phone {name} {phones[0]}",
+            f"change phone {name} {phones[0]} {phones[-1]}",
+            f"days to birthday {name}",
+            f"phone {name}",
+            f"find {name[:5]}",
+            "show all --page 2 --sort",
+        ]))
+    return lines
+
+
+def measure(size: int) -> dict:
+    # seconds per operation of every path for the book of given size
+    generator = random.Random(size)
+    contacts = synthetic_contacts(size)
+    sample = generator.sample(contacts, min(size, 1000))
+    results = {}
+
+    parser = UserInputParser()
+    results["parse_user_input"] = per_item(parser.parse_user_input, command_lines(contacts, 10_000, generator))
+
+    def add_contacts():
+        book = AddressBook(journal=False)
+        for name, phones, birthday in contacts:
+            book.add_new_contact(name=Name(name), phone=Phone(phones[0]),
+                                 birthday=Birthday(birthday.strftime("%d-%m-%Y")) if birthday is not None else None)
+    results["add_new_contact"] = best_time(add_contacts, repeat=1) / size
+
+    records = synthetic_records(size)
+    book = AddressBook(journal=False)
+    book.data.update(records)
+    for record in records.values():
+        record._book = book
+    results["find_by_name"] = per_item(book.find_by_name, [name for name, _, _ in sample])
+    results["find_by_pattern, first (index build)"] = best_time(lambda: book.find_by_pattern("zzz"), repeat=1)
+    name_patterns = [name[:7].lower() for name, _, _ in sample[:200]]
+    phone_patterns = [phones[0][-7:] for _, phones, _ in sample[:200]]
+    results["find_by_pattern, name"] = per_item(book.find_by_pattern, name_patterns)
+    results["find_by_pattern, phone"] = per_item(book.find_by_pattern, phone_patterns)
+    today = date(2024, 2, 28)
+    results["days_to_birthday"] = per_item(lambda record: record.days_to_birthday(today),
+                                           [records[name] for name, _, _ in sample])
+
+    cli = CommandLineInterface(answer="yes")
+    cli.setup_book(book)
+
+    def show_all():
+        for _ in cli.show_all_handler():
+            pass
+    results["show_all_handler, first"] = best_time(show_all, repeat=1)
+    results["show_all_handler"] = best_time(show_all, repeat=5)
+
+    with tempfile.TemporaryDirectory() as directory:
+        current_directory = os.getcwd()
+        os.chdir(directory)
+        try:
+            results["save"] = best_time(book.compact)
+
+            def restore():
+                with redirect_stdout(io.StringIO()):
+                    AddressBook(journal=False).__enter__()
+            results["restore"] = best_time(restore)
+        finally:
+            os.chdir(current_directory)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    # (size, path, baseline seconds, current seconds) of paths slower than baseline * (1 + tolerance)
+    regressions = []
+    for size, paths in results.items():
+        for path, seconds in paths.items():
+            old_seconds = baseline.get(size, {}).get(path)
+            if old_seconds is not None and seconds > old_seconds * (1 + tolerance):
+                regressions.append((size, path, old_seconds, seconds))
+    return regressions
+
+
+def print_results(results: dict, baseline: dict):
+    for size, paths in results.items():
+        print(f"\n{int(size):,} contacts, seconds per operation")
+        for path, seconds in paths.items():
+            old_seconds = baseline.get(size, {}).get(path)
+            change = f"{(seconds / old_seconds - 1) * 100:+8.1f}%" if old_seconds else ""
+            print(f"{path:>38} {seconds:>14.9f} {change}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark suite of phonebook")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="json file of previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 means 25%%")
+    arguments = parser.parse_args(argv)
+
+    results = {str(size): measure(size) for size in arguments.sizes}
+    baseline = {}
+    if arguments.baseline is not None:
+        with open(arguments.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+    print_results(results, baseline)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    with open(arguments.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults are saved to '{arguments.output}'")
+
+    regressions = compare(results, baseline, arguments.tolerance)
+    for size, path, old_seconds, seconds in regressions:
+        print(f"REGRESSION {int(size):,} contacts, {path}: {old_seconds:.9f} s -> {seconds:.9f} s")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def directory(tmp_path, monkeypatch):
+    # storages keep their files in the current directory
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
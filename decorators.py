@@ -1,11 +1,19 @@
 import functools
+import time
+from types import GeneratorType
+
+from metrics import metrics
 
 
 def parser_error_handler(func):
     @functools.wraps(func)
     def wrapper(self, user_input: str):
+        started = time.perf_counter()
+        failed = True
         try:
-            return func(self, user_input)
+            result = func(self, user_input)
+            failed = False
+            return result
         except ValueError as e:
             print("Incorrect input.\nPlease check details and enter correct command.")
             return str(e)
@@ -15,19 +23,50 @@ def parser_error_handler(func):
         except TypeError as e:
             print("Incorrect input.\nPlease check details and enter correct command.")
             return str(e)
+        finally:
+            metrics.record("(parser)", time.perf_counter() - started, failed)
     return wrapper
 
 
 def command_error_handler(func):
+    # time, count and errors of every command are recorded in metrics.metrics
+    command = func.__name__.removesuffix("_handler").replace("_", " ")
+
     @functools.wraps(func)
     def wrapper(*args):
+        started = time.perf_counter()
+        failed = streamed = False
         try:
-            return func(*args)
+            result = func(*args)
+            if isinstance(result, GeneratorType):
+                # time of output that is streamed by blocks is recorded when the stream ends
+                streamed = True
+                return metrics.timed_stream(command, result, started)
+            return result
         except ValueError as e:
+            failed = True
             return str(e)
         except KeyError as e:
+            failed = True
             return str(e)
         except Exception as e:
+            failed = True
             return str(e)
+        finally:
+            if not streamed:
+                metrics.record(command, time.perf_counter() - started, failed)
     return wrapper
 
+
+def record_mutation(func):
+    @functools.wraps(func)
+    def wrapper(self, *args):
+        if self._book is not None:
+            self._book.record_changing(self)
+        try:
+            return func(self, *args)
+        finally:
+            self._rendered = None
+            if self._book is not None:
+                self._book.record_changed(self)
+    return wrapper
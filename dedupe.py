@@ -0,0 +1,174 @@
+from collections import defaultdict
+import re
+
+from indexes import edit_distance, letter_masks, phonetic_key
+
+# contacts are compared only inside blocks: contacts with the same last digits of a phone, with the same
+# name key, and neighbours in the list of contacts sorted by name key (and by reversed name key, for typos
+# at the start); so the number of comparisons grows with the size of the book, not with its square
+phone_digits = 9
+neighbours = 3
+# bigger blocks (e.g. a phone of an office shared by many contacts) are not compared, they are reported
+max_block_size = 100
+# names with phonetic keys closer than this are similar
+max_name_distance = 2
+
+
+def name_key(name: str) -> str:
+    # phonetic keys of words of the name in alphabetical order: 'Kovalenko Andrii', 'andrey_kovalenko'
+    # and 'Андрій Коваленко' get the same key; numbers are kept as they are ('Ivan2' is not 'Ivan22')
+    words = re.findall(r"[^\W\d_]+|\d+", str(name))
+    return " ".join(sorted(word if word.isdigit() else phonetic_key(word) for word in words))
+
+
+class Contact:
+    __slots__ = ("key", "name_key", "masks", "phones", "birthday")
+
+    def __init__(self, key, record):
+        self.key = key
+        self.name_key = name_key(record.name.value)
+        self.masks = None
+        self.phones = {phone._value for phone in record.phone if phone._value is not None}
+        self.birthday = record.birthday._value if record.birthday is not None else None
+
+
+def compare(first: Contact, second: Contact) -> str | None:
+    # reason why two contacts are the same person or None
+    if first.birthday is not None and second.birthday is not None and first.birthday != second.birthday:
+        return None
+    if first.name_key == second.name_key:
+        return "same name"
+    if abs(len(first.name_key) - len(second.name_key)) > max_name_distance:
+        similar_names = False
+    else:
+        if first.masks is None:
+            first.masks = letter_masks(first.name_key)
+        similar_names = edit_distance(first.name_key, second.name_key, first.masks) <= max_name_distance
+    if not similar_names:
+        return None
+    if first.phones & second.phones:
+        return "similar name and same phone"
+    if first.birthday is not None and first.birthday == second.birthday:
+        return "similar name and same birthday"
+    return None
+
+
+class DuplicatesReport:
+
+    def __init__(self, contacts: int):
+        self.contacts = contacts
+        self.max_block_size = max_block_size
+        self.blocks = 0
+        self.skipped_blocks = 0
+        self.comparisons = 0
+        # groups of keys, the contact that is kept is the first; reasons of groups by the first key
+        self.groups = []
+        self.reasons = {}
+
+
+def find_duplicates(book) -> DuplicatesReport:
+    contacts = [Contact(key, record) for key, record in book.data.items()]
+    report = DuplicatesReport(len(contacts))
+
+    blocks = defaultdict(list)
+    for position, contact in enumerate(contacts):
+        blocks[contact.name_key].append(position)
+        for number in contact.phones:
+            blocks[number % 10 ** phone_digits].append(position)
+    by_name = sorted(range(len(contacts)), key=lambda position: contacts[position].name_key)
+    by_reversed_name = sorted(range(len(contacts)), key=lambda position: contacts[position].name_key[::-1])
+    # place of every contact in by_name: neighbours by reversed name that are close there are already compared
+    name_places = [0] * len(contacts)
+    for place, position in enumerate(by_name):
+        name_places[position] = place
+
+    # groups are joined with union-find; group keeps its birthday, so groups with different birthdays
+    # are not joined through a contact without birthday
+    parents = list(range(len(contacts)))
+    birthdays = [contact.birthday for contact in contacts]
+
+    def find(position: int) -> int:
+        while parents[position] != position:
+            parents[position] = parents[parents[position]]
+            position = parents[position]
+        return position
+
+    # pairs of blocks, which could meet in other blocks; neighbours are only checked against them
+    compared = set()
+    reasons = {}
+
+    def check(first: int, second: int, remember: bool):
+        pair = (first, second) if first < second else (second, first)
+        if pair in compared:
+            return
+        if remember:
+            compared.add(pair)
+        report.comparisons += 1
+        reason = compare(contacts[first], contacts[second])
+        if reason is not None:
+            first_root, second_root = find(first), find(second)
+            if first_root == second_root:
+                return
+            if birthdays[first_root] is not None and birthdays[second_root] is not None \
+                    and birthdays[first_root] != birthdays[second_root]:
+                return
+            parents[second_root] = first_root
+            birthdays[first_root] = birthdays[first_root] or birthdays[second_root]
+            reasons.setdefault(pair[0], reason)
+
+    for block in blocks.values():
+        if len(block) < 2:
+            continue
+        if len(block) > max_block_size:
+            report.skipped_blocks += 1
+            continue
+        report.blocks += 1
+        for index, first in enumerate(block):
+            for second in block[index + 1:]:
+                check(first, second, remember=True)
+    for order in (by_name, by_reversed_name):
+        report.blocks += 1
+        for index, first in enumerate(order):
+            for second in order[index + 1:index + 1 + neighbours]:
+                if order is by_reversed_name and abs(name_places[first] - name_places[second]) <= neighbours:
+                    continue
+                check(first, second, remember=False)
+
+    groups = defaultdict(list)
+    for position in range(len(contacts)):
+        groups[find(position)].append(position)
+    for positions in groups.values():
+        if len(positions) < 2:
+            continue
+        # contact with more phones and with birthday is kept, then the first by name
+        positions.sort(key=lambda position: (-len(contacts[position].phones), contacts[position].birthday is None,
+                                             contacts[position].key))
+        group = [contacts[position].key for position in positions]
+        report.groups.append(group)
+        report.reasons[group[0]] = next(reasons[position] for position in sorted(positions) if position in reasons)
+    report.groups.sort()
+    return report
+
+
+def merge_duplicates(book, groups: list) -> int:
+    # phones and birthday of other contacts of every group are added to the first contact, others are deleted;
+    # returns the number of deleted contacts
+    deleted = 0
+    for group in groups:
+        kept = book.data.get(group[0])
+        if kept is None:
+            continue
+        for key in group[1:]:
+            duplicate = book.data.get(key)
+            if duplicate is None:
+                continue
+            numbers = {phone._value for phone in kept.phone}
+            for phone in duplicate.phone:
+                if phone._value is not None and phone._value not in numbers:
+                    kept.add_to_phone_field(phone)
+                    numbers.add(phone._value)
+            if kept.birthday is None and duplicate.birthday is not None:
+                kept.add_to_birthday_field(duplicate.birthday)
+            del book[key]
+            deleted += 1
+    return deleted
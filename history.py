@@ -0,0 +1,141 @@
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import time
+
+from storage import Journal, atomic_write
+
+
+class History:
+    # bounded log of changes for undo and redo. Every step is one command (or one change made outside of
+    # commands) with states of changed contacts before and after it: {"name": ..., "before": ..., "after": ...},
+    # state is Record.to_dict() or None when contact does not exist. Undo puts states "before" back in reverse
+    # order and redo puts states "after", so every step costs the number of its changes, not the size of book.
+    # With file_name steps, undos and redos are appended to the file and history survives restart.
+
+    # steps with more changes (e.g. import of a big file) are not kept; older steps could not be undone
+    # over them, so history is cleared
+    max_step_changes = 10_000
+
+    def __init__(self, size: int = 100, file_name: str = None):
+        self.size = size
+        self._undo = deque(maxlen=size)
+        self._redo = deque(maxlen=size)
+        # changes of the current command
+        self._step = None
+        self._paused = False
+        self._journal = None
+        if file_name is not None:
+            self._load(file_name)
+
+    def _load(self, file_name: str):
+        journal = Journal(file_name)
+        for entry in journal.replay():
+            if entry["op"] == "step":
+                self._undo.append(entry["step"])
+                self._redo.clear()
+            elif entry["op"] == "undone":
+                self._redo.append(entry["step"])
+            elif entry["op"] == "undo" and self._undo:
+                self._redo.append(self._undo.pop())
+            elif entry["op"] == "redo" and self._redo:
+                self._undo.append(self._redo.pop())
+            elif entry["op"] == "clear":
+                self._undo.clear()
+                self._redo.clear()
+        self._journal = journal
+        if journal.entries > 4 * self.size:
+            self._compact()
+
+    def _compact(self):
+        # file is rewritten with steps that are still kept: steps to undo, then undone steps to redo
+        entries = [{"op": "step", "step": step} for step in self._undo]
+        entries += [{"op": "undone", "step": step} for step in self._redo]
+        self._journal.close()
+        atomic_write(self._journal.file_name, lambda file: file.write("".join(
+            json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n" for entry in entries
+        ).encode("utf-8")))
+        self._journal.entries = len(entries)
+
+    def _write(self, entry: dict):
+        if self._journal is not None:
+            self._journal.append(entry)
+            if self._journal.entries > 4 * self.size:
+                self._compact()
+
+    @contextmanager
+    def step(self, command: str):
+        # changes made inside are undone and redone together; nested commands (e.g. of 'profile') join the outer
+        if self._step is not None:
+            yield
+            return
+        self._step = {"command": command, "time": time.time(), "changes": []}
+        try:
+            yield
+        finally:
+            step, self._step = self._step, None
+            if step["changes"]:
+                self._push(step)
+
+    @contextmanager
+    def paused(self):
+        # changes of restore, journal replay, undo and redo are not recorded
+        paused, self._paused = self._paused, True
+        try:
+            yield
+        finally:
+            self._paused = paused
+
+    def record(self, name: str, before: dict | None, after: dict | None):
+        if self._paused or before == after:
+            return
+        change = {"name": name, "before": before, "after": after}
+        if self._step is None:
+            self._push({"command": None, "time": time.time(), "changes": [change]})
+        elif self._step["changes"] is not None:
+            self._step["changes"].append(change)
+            if len(self._step["changes"]) > self.max_step_changes:
+                self._step["changes"] = None
+                self.clear()
+
+    def _push(self, step: dict):
+        self._undo.append(step)
+        self._redo.clear()
+        self._write({"op": "step", "step": step})
+
+    def undo(self) -> dict | None:
+        # the last step, which is moved to redo
+        if not self._undo:
+            return None
+        step = self._undo.pop()
+        self._redo.append(step)
+        self._write({"op": "undo"})
+        return step
+
+    def redo(self) -> dict | None:
+        if not self._redo:
+            return None
+        step = self._redo.pop()
+        self._undo.append(step)
+        self._write({"op": "redo"})
+        return step
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._write({"op": "clear"})
+
+    def changes(self, name: str) -> list[tuple[dict, dict]]:
+        # (step, change) of the contact, the oldest first; undone steps are not included
+        return [(step, change) for step in self._undo for change in step["changes"] if change["name"] == name]
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+
+    @staticmethod
+    def describe(step: dict) -> str:
+        started = datetime.fromtimestamp(step["time"]).strftime("%Y-%m-%d %H:%M:%S")
+        command = f"'{step['command']}'" if step["command"] is not None else "change"
+        return f"{started} {command}"
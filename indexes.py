@@ -0,0 +1,336 @@
+from collections import defaultdict
+from datetime import date, timedelta
+import calendar
+
+
+class PatternIndex:
+    # grams of length 1..3 are stored, so patterns up to 3 symbols are answered directly
+    # and longer patterns only verify records that contain all of their trigrams
+    gram_size = 3
+
+    def __init__(self):
+        self._name_grams = defaultdict(set)
+        self._phone_grams = defaultdict(set)
+        self._keys = {}
+        self._order = {}
+        self._counter = 0
+
+    @classmethod
+    def grams(cls, text: str) -> set:
+        result = set()
+        for size in range(1, cls.gram_size + 1):
+            for start in range(len(text) - size + 1):
+                result.add(text[start:start + size])
+        return result
+
+    @staticmethod
+    def record_keys(record) -> tuple[set, set]:
+        name_grams = PatternIndex.grams(str(record.name.value).lower())
+        phone_grams = set()
+        for phone in record.phone:
+            if phone.value is not None:
+                phone_grams |= PatternIndex.grams(phone.value)
+        return name_grams, phone_grams
+
+    def add(self, key, record):
+        if key in self._keys:
+            self.remove(key)
+        else:
+            self._order[key] = self._counter
+            self._counter += 1
+        name_grams, phone_grams = self.record_keys(record)
+        for gram in name_grams:
+            self._name_grams[gram].add(key)
+        for gram in phone_grams:
+            self._phone_grams[gram].add(key)
+        self._keys[key] = (name_grams, phone_grams)
+
+    def remove(self, key, forget_order: bool = False):
+        name_grams, phone_grams = self._keys.pop(key, (set(), set()))
+        self._discard(self._name_grams, name_grams, key)
+        self._discard(self._phone_grams, phone_grams, key)
+        if forget_order:
+            self._order.pop(key, None)
+
+    @staticmethod
+    def _discard(grams_map: dict, grams: set, key):
+        for gram in grams:
+            keys = grams_map.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del grams_map[gram]
+
+    def discard(self, key):
+        self.remove(key, forget_order=True)
+
+    def clear(self):
+        self.__init__()
+
+    @classmethod
+    def _lookup(cls, grams_map: dict, pattern: str) -> tuple[set, bool]:
+        if len(pattern) <= cls.gram_size:
+            return grams_map.get(pattern, set()), True
+        postings = []
+        for start in range(len(pattern) - cls.gram_size + 1):
+            keys = grams_map.get(pattern[start:start + cls.gram_size])
+            if not keys:
+                return set(), True
+            postings.append(keys)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for keys in postings[1:]:
+            candidates &= keys
+            if not candidates:
+                break
+        return candidates, False
+
+    def search(self, pattern: str) -> tuple[list, bool]:
+        pattern = str(pattern)
+        if len(pattern) == 0:
+            return sorted(self._keys, key=self._order.__getitem__), True
+        name_keys, name_exact = self._lookup(self._name_grams, pattern.lower())
+        phone_keys, phone_exact = self._lookup(self._phone_grams, pattern)
+        # longer patterns give candidates only, the caller must verify them with Record.match_pattern
+        candidates = name_keys | phone_keys
+        return sorted(candidates, key=self._order.__getitem__), name_exact and phone_exact
+
+
+def next_birthday(birthday: date, today: date) -> date:
+    # contacts born on 29 February celebrate on 28 February in non-leap years
+    for year in (today.year, today.year + 1):
+        if birthday.month == 2 and birthday.day == 29 and not calendar.isleap(year):
+            candidate = date(year, 2, 28)
+        else:
+            candidate = birthday.replace(year=year)
+        if candidate >= today:
+            return candidate
+
+
+def days_to_birthday(birthday: date, today: date) -> int:
+    return (next_birthday(birthday, today) - today).days
+
+
+def calendar_walk(days: int, today: date):
+    # yields (days left, [(month, day), ...]) for the next days; each (month, day) is given once,
+    # because the walk could come back to the same day next year
+    visited = set()
+    for offset in range(min(days, 366)):
+        day = today + timedelta(days=offset)
+        buckets = [(day.month, day.day)]
+        if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+            buckets.append((2, 29))
+        buckets = [bucket for bucket in buckets if bucket not in visited]
+        visited.update(buckets)
+        if buckets:
+            yield offset, buckets
+
+
+class BirthdayIndex:
+    # contacts are bucketed by (month, day) of birthday, so a query walks only the requested days
+
+    def __init__(self):
+        self._buckets = defaultdict(set)
+        self._keys = {}
+
+    def add(self, key, record):
+        self.remove(key)
+        birthday = record.birthday.value if record.birthday is not None else None
+        if birthday is not None:
+            bucket = (birthday.month, birthday.day)
+            self._buckets[bucket].add(key)
+            self._keys[key] = bucket
+
+    def remove(self, key):
+        bucket = self._keys.pop(key, None)
+        if bucket is not None:
+            keys = self._buckets[bucket]
+            keys.discard(key)
+            if not keys:
+                del self._buckets[bucket]
+
+    def discard(self, key):
+        self.remove(key)
+
+    def upcoming(self, days: int, today: date) -> list[tuple[int, str]]:
+        # (days left, key) for birthdays from today till today + days - 1, nearest first
+        result = []
+        for offset, buckets in calendar_walk(days, today):
+            keys = set()
+            for bucket in buckets:
+                keys |= self._buckets.get(bucket, set())
+            result.extend((offset, key) for key in sorted(keys))
+        return result
+
+
+class PhoneIndex:
+    # normalized number (integer of 12 digits) -> names of contacts with this number
+
+    def __init__(self):
+        self._owners = defaultdict(set)
+        self._keys = {}
+
+    def add(self, key, record):
+        self.remove(key)
+        numbers = {phone._value for phone in record.phone if phone._value is not None}
+        for number in numbers:
+            self._owners[number].add(key)
+        self._keys[key] = numbers
+
+    def remove(self, key):
+        for number in self._keys.pop(key, ()):
+            keys = self._owners[number]
+            keys.discard(key)
+            if not keys:
+                del self._owners[number]
+
+    def discard(self, key):
+        self.remove(key)
+
+    def owners(self, number: int) -> frozenset:
+        # a copy, so callers could not change the index and could change the book while they use it
+        return frozenset(self._owners.get(number, ()))
+
+
+# Ukrainian and Russian letters in Latin, so 'Андрій' and 'Andrii' get the same key
+transliteration = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "h", "ґ": "g", "д": "d", "е": "e", "є": "ie", "ж": "zh", "з": "z",
+    "и": "y", "і": "i", "ї": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p",
+    "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch",
+    "ь": "", "ю": "iu", "я": "ia", "ё": "e", "ъ": "", "ы": "y", "э": "e", "'": "", "’": "",
+})
+
+# letters that are written differently in the same name: Andrey / Andrii / Andriy, Serhii / Sergey, Mykhailo
+phonetic_replacements = (("kh", "h"), ("g", "h"), ("ph", "f"), ("w", "v"), ("q", "k"), ("x", "ks"), ("ck", "k"),
+                         ("c", "k"), ("y", "i"), ("j", "i"))
+
+
+def phonetic_key(name: str) -> str:
+    key = str(name).lower().translate(transliteration)
+    for old, new in phonetic_replacements:
+        key = key.replace(old, new)
+    # double letters are dropped: Andrii -> andri
+    return "".join(letter for position, letter in enumerate(key)
+                   if letter.isalnum() and (position == 0 or letter != key[position - 1]))
+
+
+def letter_masks(text: str) -> dict:
+    # letter -> bits of its positions in text
+    masks = {}
+    for position, letter in enumerate(text):
+        masks[letter] = masks.get(letter, 0) | 1 << position
+    return masks
+
+
+def edit_distance(first: str, second: str, masks: dict = None) -> int:
+    # Levenshtein distance (insert, delete, replace) with bit-parallel algorithm of Myers: one column of
+    # the distance table is kept as bits of integers, so a letter of second costs a few operations;
+    # letter_masks(first) could be passed when first is compared with many strings
+    if len(first) == 0:
+        return len(second)
+    masks = masks if masks is not None else letter_masks(first)
+    all_bits = (1 << len(first)) - 1
+    last_bit = 1 << (len(first) - 1)
+    positive, negative, distance = all_bits, 0, len(first)
+    for letter in second:
+        equal = masks.get(letter, 0)
+        vertical = equal | negative
+        horizontal = (((equal & positive) + positive) ^ positive) | equal
+        horizontal_positive = negative | ~(horizontal | positive) & all_bits
+        horizontal_negative = positive & horizontal
+        if horizontal_positive & last_bit:
+            distance += 1
+        elif horizontal_negative & last_bit:
+            distance -= 1
+        horizontal_positive = (horizontal_positive << 1 | 1) & all_bits
+        horizontal_negative = (horizontal_negative << 1) & all_bits
+        positive = horizontal_negative | ~(vertical | horizontal_positive) & all_bits
+        negative = horizontal_positive & vertical
+    return distance
+
+
+class FuzzyIndex:
+    # SymSpell-like index: every phonetic key is stored under all its variants with up to max_distance letters
+    # deleted, so a query looks up only variants of its own key instead of comparing with every contact.
+    # Variants are made from first and from last prefix_length letters, a close key must be found by both
+    # of them, and the rest is checked with edit_distance
+    max_distance = 2
+    prefix_length = 7
+
+    def __init__(self):
+        self._prefix_deletes = defaultdict(set)
+        self._suffix_deletes = defaultdict(set)
+        self._phonetic_keys = defaultdict(set)
+        self._keys = {}
+
+    @classmethod
+    def deletes(cls, text: str) -> set:
+        text = text[:cls.prefix_length]
+        result = {text}
+        # letters are deleted left to right, so every variant is made once
+        current = [(text, 0)]
+        for _ in range(cls.max_distance):
+            current = [(variant[:position] + variant[position + 1:], position)
+                       for variant, start in current for position in range(start, len(variant))]
+            result.update(variant for variant, _ in current)
+        return result
+
+    def _variants(self, phonetic: str):
+        yield self._prefix_deletes, self.deletes(phonetic)
+        yield self._suffix_deletes, self.deletes(phonetic[::-1])
+
+    def add(self, key, record):
+        phonetic = phonetic_key(record.name.value)
+        if self._keys.get(key) == phonetic:
+            return
+        self.remove(key)
+        if phonetic not in self._phonetic_keys:
+            for deletes_map, variants in self._variants(phonetic):
+                for variant in variants:
+                    deletes_map[variant].add(phonetic)
+        self._phonetic_keys[phonetic].add(key)
+        self._keys[key] = phonetic
+
+    def remove(self, key):
+        phonetic = self._keys.pop(key, None)
+        if phonetic is None:
+            return
+        keys = self._phonetic_keys[phonetic]
+        keys.discard(key)
+        if keys:
+            return
+        del self._phonetic_keys[phonetic]
+        for deletes_map, variants in self._variants(phonetic):
+            for variant in variants:
+                phonetics = deletes_map[variant]
+                phonetics.discard(phonetic)
+                if not phonetics:
+                    del deletes_map[variant]
+
+    def discard(self, key):
+        self.remove(key)
+
+    def search(self, name: str, limit: int = 5) -> list[tuple[int, str]]:
+        # (distance, key) of closest contacts, distance is counted between phonetic keys
+        phonetic = phonetic_key(name)
+        if len(phonetic) == 0:
+            # name without letters and digits is close to every short name
+            return []
+        candidates = None
+        for deletes_map, variants in self._variants(phonetic):
+            found = set()
+            for variant in variants:
+                found |= deletes_map.get(variant, set())
+            candidates = found if candidates is None else candidates & found
+        result = []
+        masks = letter_masks(phonetic)
+        for candidate in candidates:
+            if abs(len(candidate) - len(phonetic)) > self.max_distance:
+                continue
+            distance = edit_distance(phonetic, candidate, masks)
+            if distance <= self.max_distance:
+                result.extend((distance, key) for key in self._phonetic_keys[candidate])
+        # the same distance is ordered by distance of written names, then by name
+        name = str(name).lower()
+        result.sort(key=lambda item: (item[0], edit_distance(name, item[1].lower()), item[1]))
+        return result[:limit]
@@ -1,8 +1,22 @@
+import argparse
 from collections import UserDict
-from datetime import datetime
-import pickle
-
-from decorators import parser_error_handler, command_error_handler
+from contextlib import contextmanager, nullcontext, redirect_stdout
+from datetime import datetime, date
+import io
+from itertools import islice
+import json
+import math
+import os
+import sys
+import threading
+
+from decorators import parser_error_handler, command_error_handler, record_mutation
+from history import History
+from indexes import BirthdayIndex, FuzzyIndex, PatternIndex, PhoneIndex, days_to_birthday, phonetic_key
+from metrics import metrics
+from shards import ShardedStorage
+from storage import AutoSaver, Journal, storages
+from validators import normalize_phone, parse_birthday, set_phone_plans
 
 commands_dict = {
     "hello",
@@ -14,16 +28,49 @@ commands_dict = {
     "delete phone",
     "delete birthday",
     "days to birthday",
+    "upcoming birthdays",
     "phone",
+    "whois",
     "find",
+    "fuzzy",
     "show all",
     "good bye",
     "close",
     "exit",
+    "import",
+    "export",
+    "stats",
+    "profile",
+    "undo",
+    "redo",
+    "history",
+    "dedupe",
+}
+
+# commands that change the book, all other commands only read it
+write_commands = {
+    "add contact",
+    "add phone",
+    "add birthday",
+    "change phone",
+    "delete contact",
+    "delete phone",
+    "delete birthday",
+    "import",
+    "dedupe",
+    "undo",
+    "redo",
+    # profile runs any command (and the server runs only one profiler at once)
+    "profile",
 }
 
+# formats of contacts in output of commands
+output_formats = ("text", "table", "json")
+
 
 class Field:
+    __slots__ = ("_value",)
+
     def __init__(self, value: str):
         self._value = None
         self.value = value
@@ -36,143 +83,501 @@ class Field:
     def value(self, value):
         self._value = value
 
+    @staticmethod
+    def _pack(value):
+        return value
+
+    @classmethod
+    def from_value(cls, value):
+        # restores already validated value from storage without running the setter
+        field = cls.__new__(cls)
+        field._value = cls._pack(value)
+        return field
+
+    def __getstate__(self):
+        return {"_value": self._value}
+
+    def __setstate__(self, state):
+        # accepts both slots state and __dict__ state of books saved before fields got __slots__
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **state[1]}
+        self._value = self._pack(state.get("_value"))
+
 
 class Name(Field):
-    pass
+    __slots__ = ()
+
+    @property
+    def value(self) -> str:
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = sys.intern(value) if isinstance(value, str) else value
 
 
 class Phone(Field):
+    # number is kept as integer of its digits (380XXXXXXXXX by default), "+" is added back on reading
+    __slots__ = ()
+
     @property
     def value(self) -> str:
-        return self._value
+        return "+" + str(self._value) if self._value is not None else None
 
     @value.setter
     def value(self, value):
-        phone_number = (
-            value.strip()
-            .removeprefix("+")
-            .replace("(", "")
-            .replace(")", "")
-            .replace("-", "")
-            .replace(" ", "")
-        )
-        if phone_number.isdigit() and phone_number.startswith("380") and len(phone_number) == 12:
-            self._value = "+" + phone_number
+        phone_number = normalize_phone(value)
+        if phone_number is not None:
+            self._value = int(phone_number)
         else:
             self._value = None
             print(f"Entered number '{value}' is not valid. Please use format: '+38-0XX-XXX-XX-XX'")
 
+    @staticmethod
+    def _pack(value):
+        if isinstance(value, str):
+            return int(value.removeprefix("+"))
+        return value
+
 
 class Birthday(Field):
+    # date is kept as its ordinal number
+    __slots__ = ()
+
     @property
     def value(self) -> datetime.date:
-        return self._value
+        return date.fromordinal(self._value) if self._value is not None else None
 
     @value.setter
     def value(self, value):
         try:
-            self._value = datetime.strptime(value, "%d-%m-%Y").date()
+            self._value = parse_birthday(value).toordinal()
         except ValueError:
             print(f"Entered {value} is not correct date. Please use format: 'dd-mm-yyyy'")
 
+    @staticmethod
+    def _pack(value):
+        if isinstance(value, date):
+            return value.toordinal()
+        return value
+
     def __repr__(self):
-        return datetime.strftime(self._value, "%d-%m-%Y")
+        return datetime.strftime(self.value, "%d-%m-%Y")
 
 
 class Record:
+    __slots__ = ("_book", "_rendered", "name", "phone", "birthday", "__weakref__")
+    table_header = f"{'name':<20} {'phones':<40} birthday"
 
     def __init__(self, name: Name, phone: Phone = None, birthday: Birthday = None):
+        self._book = None
+        self._rendered = None
         self.name = name
         self.phone = [phone] if phone is not None else []
         self.birthday = birthday
 
+    def __getstate__(self):
+        return {"name": self.name, "phone": self.phone, "birthday": self.birthday}
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **state[1]}
+        self._book = None
+        self._rendered = None
+        self.name = state["name"]
+        self.phone = state["phone"]
+        self.birthday = state.get("birthday")
+
+    def to_dict(self) -> dict:
+        birthday = self.birthday.value if self.birthday is not None else None
+        return {
+            "name": self.name.value,
+            "phone": [phone.value for phone in self.phone],
+            "birthday": birthday.isoformat() if birthday is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict):
+        record = cls(name=Name(state["name"]))
+        record.phone = [Phone.from_value(phone) for phone in state["phone"]]
+        if state["birthday"] is not None:
+            record.birthday = Birthday.from_value(date.fromisoformat(state["birthday"]))
+        return record
+
+    @classmethod
+    def from_row(cls, name: str, numbers: list, ordinal: int = None):
+        # restores record from columns of binary storage: phones as integers, birthday as ordinal
+        record = cls(name=Name.from_value(name))
+        record.phone = [Phone.from_value(number) for number in numbers]
+        if ordinal is not None:
+            record.birthday = Birthday.from_value(ordinal)
+        return record
+
+    def copy(self):
+        # fields are not changed in place and list of phones is replaced on every change,
+        # so they could be shared with the copy
+        record = Record(self.name, birthday=self.birthday)
+        record.phone = self.phone
+        return record
+
+    @record_mutation
     def add_to_phone_field(self, phone_number: Phone):
-        self.phone.append(phone_number)
+        self.phone = [*self.phone, phone_number]
 
+    @record_mutation
     def add_to_birthday_field(self, birthday: Birthday):
         self.birthday = birthday
 
+    @record_mutation
     def change_in_phone_field(self, old_number: Phone, new_number: Phone):
         try:
-            self.phone.remove(old_number)
-            self.phone.append(new_number)
+            phones = list(self.phone)
+            phones.remove(old_number)
+            self.phone = [*phones, new_number]
         except ValueError:
             print(f"Contact does not contain such phone number: {old_number}")
 
+    @record_mutation
     def delete_from_phone_field(self, phone: Phone):
         try:
-            self.phone.remove(phone)
+            phones = list(self.phone)
+            phones.remove(phone)
+            self.phone = phones
         except ValueError:
             print(f"Contact does not contain such phone number: {phone}")
 
+    @record_mutation
     def delete_from_birthday_field(self):
-        self.birthday.value = None
+        self.birthday = None
 
     def find_in_phone_field(self, find_phone: str):
+        phone_number = normalize_phone(str(find_phone))
+        if phone_number is None:
+            return None
         for phone in self.phone:
-            if phone.value == find_phone:
+            if phone._value == int(phone_number):
                 return phone
         return None
 
-    def days_to_birthday(self):
-        current_date = datetime.now()
-        if self.birthday is not None:
-            birthday: datetime.date = self.birthday.value.date()
-            next_birthday = datetime(year=current_date.year, month=birthday.month, day=birthday.day).date()
-            if next_birthday < current_date:
-                next_birthday = datetime(
-                    year=next_birthday.year + 1,
-                    month=next_birthday.month,
-                    day=next_birthday.day,
-                )
-            return (next_birthday - current_date).days
+    def has_birthday(self) -> bool:
+        return self.birthday is not None and self.birthday.value is not None
+
+    def days_to_birthday(self, today: date = None):
+        if self.has_birthday():
+            return days_to_birthday(self.birthday.value, today or date.today())
         return None
 
     def match_pattern(self, pattern):
         if str(pattern).lower() in str(self.name.value).lower():
             return True
         for phone in self.phone:
-            if pattern in phone.value:
+            if phone.value is not None and pattern in phone.value:
                 return True
         return False
 
-    def __repr__(self):
-        if self.birthday.value is not None:
-            return f"name: {self.name.value}; number: {' '.join(phone.value for phone in self.phone)}; " \
-                   f"birthday: {self.birthday.value}"
+    def render(self, output_format: str = "text") -> str:
+        # rendered lines are kept until the record is changed (see decorators.record_mutation)
+        if self._rendered is None:
+            self._rendered = {}
+        line = self._rendered.get(output_format)
+        if line is None:
+            line = self._rendered[output_format] = getattr(self, "_render_" + output_format)()
+        return line
+
+    def _phones_line(self) -> str:
+        return " ".join(phone.value for phone in self.phone if phone.value is not None)
+
+    def _render_text(self) -> str:
+        if self.has_birthday():
+            return f"name: {self.name.value}; number: {self._phones_line()}; birthday: {self.birthday.value}"
         else:
-            return f"Name: {self.name.value}; Number: {' '.join(phone.value for phone in self.phone)}"
+            return f"Name: {self.name.value}; Number: {self._phones_line()}"
+
+    def _render_table(self) -> str:
+        birthday = self.birthday.value.strftime("%d-%m-%Y") if self.has_birthday() else ""
+        return f"{self.name.value:<20} {self._phones_line():<40} {birthday}".rstrip()
+
+    def _render_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    def __repr__(self):
+        return self.render()
 
 
 class AddressBook(UserDict):
-    __book_name = "address_book.pickle"
+    compact_min_entries = 1000
+    compact_ratio = 0.5
+
+    def __init__(self, *args, journal: bool = True, backend: str = "binary", unique_phones: bool = False,
+                 history: int = 100, keep_history: bool = False, lazy: bool = False, read_only: bool = False,
+                 **kwargs):
+        # backend is one of storage.storages: 'binary', 'pickle', 'mapped' (lazy memory-mapped file) or 'sqlite'
+        # history is the number of steps that could be undone (0 - no undo), with keep_history they are kept
+        # in '<book file>.history' between sessions
+        # lazy opens 'binary' book without making all records, records are made when they are used;
+        # read_only book is never written, its changes are lost on exit
+        # indexes are built on first query and then kept up to date on every change
+        self._indexes = {}
+        self._lazy = lazy
+        self._read_only = read_only
+        # number of changes since the book was opened, unchanged book is not saved
+        self._changes = 0
+        self._history = History(history) if history > 0 else None
+        self._keep_history = keep_history
+        # state of the record that is being changed, see record_changing
+        self._state_before = None
+        self._unique_phones = unique_phones
+        self._journal_enabled = journal and not read_only
+        self._journal = None
+        self._autosaver = None
+        # snapshot that is saved in background and lock of journal and snapshot
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._storage = storages[backend]()
+        super().__init__(*args, **kwargs)
+        if self._storage.lazy:
+            records = self.data
+            self.data = self._storage.records(self._load_record)
+            self.data.update(records)
+
+    def _load_record(self, state) -> Record:
+        # state is Record.to_dict() or row (key, name, phones, birthday ordinal) of binary storage
+        record = Record.from_dict(state) if isinstance(state, dict) else Record.from_row(*state[1:])
+        record._book = self
+        return record
+
+    def _index(self, index_class):
+        index = self._indexes.get(index_class)
+        if index is None:
+            provided_index = getattr(self.data, "index", None)
+            if provided_index is not None:
+                index = provided_index(index_class)
+            if index is None:
+                index = index_class()
+                for key, record in self.data.items():
+                    index.add(key, record)
+            self._indexes[index_class] = index
+        return index
+
+    @contextmanager
+    def bulk(self):
+        # storages that write every change at once could group many changes together
+        bulk = getattr(self.data, "bulk", None)
+        if bulk is None:
+            yield
+            return
+        with bulk():
+            yield
+
+    def __setitem__(self, key, record: Record):
+        previous = self.data.get(key)
+        if previous is not None and previous is not record:
+            previous._book = None
+        self.data[key] = record
+        record._book = self
+        for index in self._indexes.values():
+            index.add(key, record)
+        state = record.to_dict()
+        self._log({"op": "put", "record": state})
+        if self._history is not None and previous is not record:
+            self._history.record(key, previous.to_dict() if previous is not None else None, state)
+
+    def __delitem__(self, key):
+        record = self.data.pop(key)
+        record._book = None
+        for index in self._indexes.values():
+            index.discard(key)
+        self._log({"op": "delete", "name": key})
+        if self._history is not None:
+            self._history.record(key, record.to_dict(), None)
+
+    def record_changing(self, record: Record):
+        if self._history is not None:
+            self._state_before = record.to_dict()
+        # copy-on-write: snapshot that is being saved keeps the record as it was
+        snapshot = self._snapshot
+        if snapshot is not None:
+            key = record.name.value
+            if snapshot.get(key) is record:
+                snapshot[key] = record.copy()
+
+    def record_changed(self, record: Record):
+        key = record.name.value
+        if self.data.get(key) is record:
+            # lazy storages keep changed records in memory or write them at once
+            self.data[key] = record
+            for index in self._indexes.values():
+                index.add(key, record)
+            state = record.to_dict()
+            self._log({"op": "put", "record": state})
+            if self._history is not None and self._state_before is not None:
+                self._history.record(key, self._state_before, state)
+        self._state_before = None
+
+    def _log(self, entry: dict):
+        self._changes += 1
+        if self._journal is not None and self._journal_enabled:
+            with self._lock:
+                self._journal.append(entry)
+            if self._autosaver is None:
+                self._compact_if_needed()
+        if self._autosaver is not None:
+            self._autosaver.changed()
+
+    def _compact_if_needed(self):
+        if self._journal.entries > max(self.compact_min_entries, len(self.data) * self.compact_ratio):
+            self.compact()
+
+    def __replay_journal(self):
+        if self._storage.journal_name is None:
+            return
+        journal = Journal(self._storage.journal_name)
+        for entry in journal.replay(repair=not self._read_only):
+            if entry["op"] == "put":
+                self[entry["record"]["name"]] = Record.from_dict(entry["record"])
+            elif entry["op"] == "delete" and entry["name"] in self.data:
+                del self[entry["name"]]
+        self._journal = journal
+        if self._journal_enabled:
+            self._compact_if_needed()
+
+    def compact(self):
+        self._storage.write(self.data)
+        if self._journal is not None:
+            self._journal.truncate()
+
+    def start_autosave(self, interval: float = 60, threshold: int = 1000):
+        # lazy storages are not saved in background: sqlite writes every change at once
+        # and mapped file is rewritten from journal
+        if self._autosaver is None and not self._storage.lazy:
+            self._autosaver = AutoSaver(self, interval, threshold).start()
+        return self._autosaver
+
+    def snapshot(self) -> dict:
+        # shallow copy of records, which is cheap to take; records changed while it is saved are copied
+        # before the change (see record_changing) and journal entries up to this moment are kept until it is saved
+        with self._lock:
+            snapshot = self._snapshot = dict(self.data)
+            if self._journal is not None and self._journal_enabled:
+                self._journal.rotate()
+        return snapshot
+
+    def save_snapshot(self, snapshot: dict):
+        try:
+            self._storage.write(snapshot)
+            if self._journal is not None and self._journal_enabled:
+                self._journal.drop_pending()
+        finally:
+            self._snapshot = None
 
     def __enter__(self):
-        self.__restore()
+        with self.__history_paused():
+            self.__restore()
+            # journal left by other sessions is replayed even when this book does not write it
+            self.__replay_journal()
+        if self._history is not None and self._keep_history:
+            self._history = History(self._history.size, self._storage.file_name + ".history")
+        # replayed journal stays valid, so the book is saved only when it is changed after this
+        self._changes = 0
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._autosaver is not None:
+            self._autosaver.stop()
         self.__save()
+        self._storage.close()
+        if self._history is not None:
+            self._history.close()
+
+    def __history_paused(self):
+        return self._history.paused() if self._history is not None else nullcontext()
+
+    def step(self, command: str):
+        # changes made inside are one step of undo and redo
+        return self._history.step(command) if self._history is not None else nullcontext()
+
+    def undo(self) -> dict | None:
+        # contacts changed by the last step are put back as they were before it; returns the step or None
+        step = self._history.undo() if self._history is not None else None
+        if step is not None:
+            with self._history.paused():
+                for change in reversed(step["changes"]):
+                    self._put_state(change["name"], change["before"])
+        return step
+
+    def redo(self) -> dict | None:
+        step = self._history.redo() if self._history is not None else None
+        if step is not None:
+            with self._history.paused():
+                for change in step["changes"]:
+                    self._put_state(change["name"], change["after"])
+        return step
+
+    def history(self, name: str) -> list[tuple[dict, dict]]:
+        # (step, change) of the contact that could be undone, the oldest first
+        return self._history.changes(name) if self._history is not None else []
+
+    def _put_state(self, key, state: dict | None):
+        if state is not None:
+            self[key] = self._load_record(state)
+        elif key in self.data:
+            del self[key]
 
     def __restore(self):
+        # the first start with new backend converts existing book of binary or pickle storage;
+        # read-only book only reads it, the conversion is left to the next session that writes
+        if not self._storage.exists():
+            for backend in ("binary", "pickle"):
+                legacy_storage = storages[backend]()
+                if legacy_storage.file_name != self._storage.file_name and legacy_storage.exists():
+                    with AddressBook(journal=self._journal_enabled, backend=backend, read_only=self._read_only) as book:
+                        if self._read_only:
+                            self.update(book.data)
+                            return
+                        self._storage.write(book.data)
+                    break
+        lazy = self._lazy and not self._storage.lazy and hasattr(self._storage, "open_lazy")
         try:
-            with open(self.__book_name, "rb+") as file:
-                book = pickle.load(file)
-                self.data.update(book)
-        except Exception:
-            print("Book is not restored!")
+            records = self._storage.open_lazy(self._load_record) if lazy else self._storage.open(self._load_record)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            # damaged book is put aside, so it is not overwritten by empty book on save
+            broken_name = self._storage.file_name + ".broken"
+            self._storage.close()
+            os.replace(self._storage.file_name, broken_name)
+            print(f"Book is not restored: {e}. The file was moved to '{broken_name}'.")
+            return
+        if self._storage.lazy or lazy:
+            self.data = records
+        elif not self.data and not self._indexes:
+            # nothing to index or to journal yet, records are taken as they are
+            self.data = records if isinstance(records, dict) else dict(records)
+            for record in self.data.values():
+                record._book = self
+        else:
+            self.update(records)
 
     def __save(self):
+        if self._read_only:
+            return
+        if self._changes == 0:
+            print("Book was not changed.")
+            return
+        if self._journal is not None and self._journal_enabled:
+            # all changes are already in the journal, snapshot is rewritten only when journal grows big
+            self._journal.close()
+            print("Book was successfully saved!")
+            return
         try:
-            with open(self.__book_name, "wb+") as file:
-                pickle.dump(self.data, file, protocol=pickle.HIGHEST_PROTOCOL)
-                print("Book was successfully saved!")
+            self.compact()
+            print("Book was successfully saved!")
         except Exception:
             print("Some problems arose.")
 
     def add_new_contact(self, name: Name, phone: Phone = None, birthday: Birthday = None):
         new_contact = Record(name=name, phone=phone, birthday=birthday)
-        self.data[name.value] = new_contact
+        self[name.value] = new_contact
 
     # def delete_contact(self, name: Name):
     #     try:
@@ -181,23 +586,24 @@ class AddressBook(UserDict):
     #         return None
 
     def __iter__(self):
-        self.page = 0
-        self._items_per_page = 20
-        return self
-
-    def __next__(self):
-        records = list(self.data.items())
-        start_index = self.page * self._items_per_page
-        end_index = (self.page + 1) * self._items_per_page
-        self.page += 1
-        if len(records) > end_index:
-            to_return = records[start_index:end_index]
+        return iter(self.data)
+
+    def page_count(self, page_size: int = 20) -> int:
+        return math.ceil(len(self.data) / page_size)
+
+    def pages(self, page_size: int = 20, sort_by_name: bool = False, start_page: int = 0):
+        # lazy pages of records: the cursor moves over the book, nothing is copied page by page
+        sorted_values = getattr(self.data, "sorted_values", None)
+        if sort_by_name and sorted_values is not None:
+            # sharded book sorts its parts in worker processes
+            records = sorted_values()
+        elif sort_by_name:
+            records = (self.data[key] for key in sorted(self.data))
         else:
-            if len(records) > start_index:
-                to_return = records[start_index:len(records)]
-            else:
-                to_return = records[:-1]
-        return [{record[1]: record[0]} for record in to_return]
+            records = iter(self.data.values())
+        records = islice(records, start_page * page_size, None)
+        while page := list(islice(records, page_size)):
+            yield page
 
     def find_by_name(self, name):
         try:
@@ -205,162 +611,281 @@ class AddressBook(UserDict):
         except KeyError:
             return None
 
-    # def find_by_phone(self, phone):
-    #     for record in self.data.values():
-    #         if phone in [number.value for number in record.phone]:
-    #             return record
-    #         else:
-    #             return None
+    def phone_owners(self, phone: str) -> set:
+        phone_number = normalize_phone(str(phone))
+        if phone_number is None:
+            return set()
+        return self._index(PhoneIndex).owners(int(phone_number))
+
+    def find_by_phone(self, phone) -> list[Record]:
+        return self._records(sorted(self.phone_owners(phone)))
+
+    def check_phone_is_free(self, phone: str, username: str):
+        # in unique phones mode one number could belong to one contact only
+        if self._unique_phones:
+            owners = self.phone_owners(phone) - {username}
+            if owners:
+                raise ValueError(f"Phone '{phone}' already belongs to contact '{', '.join(sorted(owners))}'")
+
+    def merge_contact(self, state: dict):
+        # adds contact from Record.to_dict() state or adds new phones and birthday to existing one
+        for number in state["phone"]:
+            self.check_phone_is_free(number, state["name"])
+        current_record = self.data.get(state["name"])
+        if current_record is None:
+            self[state["name"]] = Record.from_dict(state)
+            return
+        for number in state["phone"]:
+            if current_record.find_in_phone_field(number) is None:
+                current_record.add_to_phone_field(Phone.from_value(number))
+        if state["birthday"] is not None:
+            current_record.add_to_birthday_field(Birthday.from_value(date.fromisoformat(state["birthday"])))
+
+    def upcoming_birthdays(self, days: int, today: date = None) -> list[tuple[int, Record]]:
+        today = today or date.today()
+        found = self._index(BirthdayIndex).upcoming(days, today)
+        return self._records([key for _, key in found], [days_left for days_left, _ in found])
 
     def find_by_pattern(self, pattern):
-        matched_contacts = []
-        for record in self.data.values():
-            if record.match_pattern(pattern):
-                matched_contacts.append(record)
+        keys, exact = self._index(PatternIndex).search(pattern)
+        matched_contacts = self._records(keys)
+        if not exact:
+            matched_contacts = [record for record in matched_contacts if record.match_pattern(pattern)]
         return matched_contacts
 
+    def find_fuzzy(self, name, limit: int = 5) -> list[tuple[int, Record]]:
+        # closest names with typos or in other alphabet, (distance, record) sorted by distance
+        found = self._index(FuzzyIndex).search(name, limit)
+        return self._records([key for _, key in found], [distance for distance, _ in found])
+
+    def _records(self, keys: list, labels: list = None) -> list:
+        # records of keys found by index, or (label, record) pairs; sharded book fetches them from worker
+        # processes only when the answer is read
+        records_of = getattr(self.data, "records_of", None)
+        if records_of is not None:
+            return records_of(keys, labels)
+        records = [self.data[key] for key in keys]
+        return records if labels is None else list(zip(labels, records))
+
+
+def build_commands_trie(commands) -> dict:
+    # token trie of commands, the name of command is stored under None key of its last token
+    trie = {}
+    for command in commands:
+        node = trie
+        for token in command.split(" "):
+            node = node.setdefault(token, {})
+        node[None] = command
+    return trie
+
 
 class UserInputParser:
+    commands_trie = build_commands_trie(commands_dict)
+
+    @classmethod
+    def match_command(cls, tokens: list) -> tuple[str, list]:
+        # the longest command that is a prefix of entered tokens wins
+        node = cls.commands_trie
+        command, length = None, 0
+        for position, token in enumerate(tokens):
+            node = node.get(token.lower())
+            if node is None:
+                break
+            if None in node:
+                command, length = node[None], position + 1
+        if command is None:
+            raise ValueError
+        return command, tokens[length:]
+
+    def parse(self, user_input: str) -> tuple[str, list]:
+        command, arguments = self.match_command(user_input.split())
+        parser = getattr(self, "_" + command.replace(" ", "_"))
+        return parser(arguments=arguments)
 
     @parser_error_handler
     def parse_user_input(self, user_input: str) -> tuple[str, list]:
-        for command in commands_dict:
-            normalized_input = " ".join(user_input.lower().strip().split(" "))
-            if normalized_input.startswith(command):
-                parser = getattr(self, "_" + command.replace(" ", "_"))
-                return parser(user_input=normalized_input)
-        raise ValueError
-
-    def _hello(self, user_input: str):
+        return self.parse(user_input)
+
+    def _hello(self, arguments: list):
         return "hello", []
 
-    def _add_contact(self, user_input: str):
-        username, number, *birthday = user_input.lstrip("add contact").strip().split(" ")
-        if len(username) > 0 and len(number) > 0:
-            username = username.capitalize()
-            return "add contact", [username, number, *birthday]
+    def _add_contact(self, arguments: list):
+        username, number, *birthday = arguments
+        if len(birthday) <= 1:
+            return "add contact", [username.capitalize(), number, *birthday]
         else:
             raise ValueError
 
-    def _add_phone(self, user_input: str):
-        username, number = user_input.lstrip("add phone").strip().split(" ")
-        if len(username) > 0 and len(number) > 0:
-            username = username.capitalize()
-            return "add phone", [username, number]
-        else:
-            raise ValueError
+    def _add_phone(self, arguments: list):
+        username, number = arguments
+        return "add phone", [username.capitalize(), number]
+
+    def _add_birthday(self, arguments: list):
+        username, birthday = arguments
+        return "add birthday", [username.capitalize(), birthday]
+
+    def _change_phone(self, arguments: list):
+        username, old_number, new_number = arguments
+        return "change phone", [username.capitalize(), old_number, new_number]
+
+    def _delete_contact(self, arguments: list):
+        username, *_ = arguments
+        return "delete contact", [username.capitalize()]
+
+    def _delete_phone(self, arguments: list):
+        username, number = arguments
+        return "delete phone", [username.capitalize(), number]
+
+    def _delete_birthday(self, arguments: list):
+        username, *_ = arguments
+        return "delete birthday", [username.capitalize()]
 
-    def _add_birthday(self, user_input: str):
-        username, birthday = user_input.lstrip("add birthday").strip().split(" ")
-        if len(username) > 0 and len(birthday) > 0:
-            username = username.capitalize()
-            return "add birthday", [username, birthday]
+    def _days_to_birthday(self, arguments: list):
+        username, *_ = arguments
+        return "days to birthday", [username.capitalize()]
+
+    def _upcoming_birthdays(self, arguments: list):
+        days, = arguments
+        if days.isdigit():
+            return "upcoming birthdays", [int(days)]
         else:
             raise ValueError
 
-    def _change_phone(self, user_input: str):
-        username, old_number, new_number = user_input.lstrip("change phone").strip().split(" ")
-        if len(username) > 0 and len(old_number) > 0 and len(new_number) > 0:
-            username = username.capitalize()
-            return "change phone", [username, old_number, new_number]
+    def _phone(self, arguments: list):
+        username, *_ = arguments
+        return "phone", [username.capitalize()]
+
+    def _whois(self, arguments: list):
+        if len(arguments) > 0:
+            return "whois", [" ".join(arguments)]
         else:
             raise ValueError
 
-    def _delete_contact(self, user_input: str):
-        input_list = user_input.lstrip("delete contact").strip().split(" ")
-        username = input_list[0]
-        if len(username) > 0:
-            username = username.capitalize()
-            return "delete contact", [username]
+    def _find(self, arguments: list):
+        pattern, *_ = arguments
+        return "find", [pattern]
+
+    def _fuzzy(self, arguments: list):
+        username, *limit = arguments
+        if len(phonetic_key(username)) == 0:
+            raise ValueError
+        if len(limit) == 0:
+            return "fuzzy", [username]
+        elif len(limit) == 1 and limit[0].isdigit():
+            return "fuzzy", [username, int(limit[0])]
         else:
             raise ValueError
 
-    def _delete_phone(self, user_input: str):
-        username, number = user_input.lstrip("delete phone").strip().split(" ")
-        if len(username) > 0 and len(number) > 0:
-            username = username.capitalize()
-            return "delete phone", [username, number]
+    def _import(self, arguments: list):
+        file_name, *workers = arguments
+        if len(workers) <= 1:
+            return "import", [file_name, *[int(number) for number in workers]]
         else:
             raise ValueError
 
-    def _delete_birthday(self, user_input: str):
-        input_list = user_input.lstrip("delete birthday").strip().split(" ")
-        username = input_list[0]
-        if len(username) > 0:
-            username = username.capitalize()
-            return "delete birthday", [username]
+    def _export(self, arguments: list):
+        file_name, = arguments
+        return "export", [file_name]
+
+    def _stats(self, arguments: list):
+        if len(arguments) <= 1:
+            return "stats", arguments
         else:
             raise ValueError
 
-    def _days_to_birthday(self, user_input: str):
-        input_list = user_input.lstrip("days to birthday").strip().split(" ")
-        username = input_list[0]
-        if len(username) > 0:
-            username = username.capitalize()
-            return "days to birthday", [username]
+    def _profile(self, arguments: list):
+        if len(arguments) > 0:
+            return "profile", [" ".join(arguments)]
         else:
             raise ValueError
 
-    def _phone(self, user_input: str):
-        input_list = user_input.lstrip("phone").strip().split(" ")
-        username = input_list[0]
-        if len(username) > 0:
-            username = username.capitalize()
-            return "phone", [username]
+    def _undo(self, arguments: list):
+        if len(arguments) == 0:
+            return "undo", []
         else:
             raise ValueError
 
-    def _find(self, user_input: str):
-        input_list = user_input.lstrip("find").strip().split(" ")
-        pattern = input_list[0]
-        if len(pattern) > 0:
-            return "find", [pattern]
+    def _redo(self, arguments: list):
+        if len(arguments) == 0:
+            return "redo", []
         else:
             raise ValueError
 
-    def _show_all(self, user_input: str):
-        if user_input.lower().strip() == "show all":
-            return "show all", []
+    def _history(self, arguments: list):
+        username, *_ = arguments
+        return "history", [username.capitalize()]
+
+    def _dedupe(self, arguments: list):
+        # dedupe [--apply]
+        if len(arguments) == 0 or arguments == ["--apply"]:
+            return "dedupe", [len(arguments) > 0]
         else:
             raise ValueError
 
-    def _exit(self, user_input: str):
-        if user_input.lower().strip() == "good bye":
-            return "exit", []
-        elif user_input.lower().strip() == "close":
-            return "exit", []
-        elif user_input.lower().strip() == "exit":
+    def _show_all(self, arguments: list):
+        # show all [--page N] [--sort]
+        page, sort_by_name = None, False
+        position = 0
+        while position < len(arguments):
+            if arguments[position] == "--page" and position + 1 < len(arguments):
+                page = int(arguments[position + 1])
+                position += 2
+            elif arguments[position] == "--sort":
+                sort_by_name = True
+                position += 1
+            else:
+                raise ValueError
+        return "show all", [page, sort_by_name]
+
+    def _exit(self, arguments: list):
+        if len(arguments) == 0:
             return "exit", []
         else:
             raise ValueError
 
-    def _good_bye(self, user_input: str):
-        return self._exit(user_input)
+    def _good_bye(self, arguments: list):
+        return self._exit(arguments)
 
-    def _close(self, user_input: str):
-        return self._exit(user_input)
+    def _close(self, arguments: list):
+        return self._exit(arguments)
 
 
 class CommandLineInterface:
 
-    def __init__(self):
+    def __init__(self, answer: str = None, page_size: int = 20, backend: str = "binary", output_format: str = "text",
+                 autosave: float = 0, autosave_changes: int = 1000, history: int = 100, keep_history: bool = False,
+                 unique_phones: bool = False):
         self._book = None
         self._parsers = UserInputParser()
+        self.page_size = page_size
+        self.backend = backend
+        self.output_format = output_format
+        # book is saved in background every autosave seconds when it has changes (0 - only on exit)
+        # or when autosave_changes changes are made
+        self.autosave = autosave
+        self.autosave_changes = autosave_changes
+        # number of commands that could be undone and whether they are kept between sessions
+        self.history = history
+        self.keep_history = keep_history
+        # one number could belong to one contact only
+        self.unique_phones = unique_phones
+        # default answer ('yes' or 'no') to questions of handlers, None means to ask user
+        self._answer = answer
+
+    def ask(self, question: str) -> bool:
+        if self._answer is not None:
+            return self._answer == "yes"
+        return input(question) == "yes"
 
     @staticmethod
     def phone_validity(number: str):
-        phone_number = (
-            number.strip()
-            .removeprefix("+")
-            .replace("(", "")
-            .replace(")", "")
-            .replace("-", "")
-            .replace(" ", "")
-        )
-        if phone_number.isdigit() and phone_number.startswith("380") and len(phone_number) == 12:
-            return True
-        else:
-            return False
+        return normalize_phone(number) is not None
+
+    def render(self, records) -> str:
+        lines = "\n".join(record.render(self.output_format) for record in records)
+        if self.output_format == "table":
+            return Record.table_header + "\n" + lines
+        return lines
 
     @command_error_handler
     def hello_handler(self, *args):
@@ -370,19 +895,24 @@ class CommandLineInterface:
     def add_contact_handler(self, username: str, number: str, birthday=None):
         if self._book.find_by_name(username):
             current_record: Record = self._book.find_by_name(username)
-            if current_record.find_in_phone_field(number) is not None:
+            if not self.phone_validity(number):
+                return f"Entered '{number}' is not a phone number.\nPlease use format: '+38-0XX-XXX-XX-XX'"
+            if username in self._book.phone_owners(number):
                 raise ValueError(f"Contact with name '{username}' and phone {number} already exist in phonebook")
             else:
-                user_decision = input(f"Contact with name '{username}' already exist in phonebook. "
-                                      f"Do you want to add phone '{number}' to existing record? "
-                                      f"Please print 'yes' or 'no': ")
-                if user_decision == "yes":
+                self._book.check_phone_is_free(number, username)
+                if self.ask(f"Contact with name '{username}' already exist in phonebook. "
+                            f"Do you want to add phone '{number}' to existing record? "
+                            f"Please print 'yes' or 'no': "):
                     current_record.add_to_phone_field(Phone(number))
+                    return f"Phone '{number}' was added successfully to existing contact'{username}'"
                 else:
-                    pass
+                    return f"Contact '{username}' was not changed"
         else:
             if self.phone_validity(number):
-                self._book.add_new_contact(name=Name(username), phone=Phone(number), birthday=Birthday(birthday))
+                self._book.check_phone_is_free(number, username)
+                self._book.add_new_contact(name=Name(username), phone=Phone(number),
+                                           birthday=Birthday(birthday) if birthday is not None else None)
                 return f"New contact with name '{username}' and phone '{number}' was added successfully to phonebook"
             else:
                 return f"Entered '{number}' is not a phone number.\nPlease use format: '+38-0XX-XXX-XX-XX'"
@@ -391,8 +921,11 @@ class CommandLineInterface:
     def add_phone_handler(self, username: str, number: str):
         if self._book.find_by_name(username):
             current_record: Record = self._book.find_by_name(username)
-            if current_record.find_in_phone_field(number) is not None:
+            if not self.phone_validity(number):
+                return f"Entered '{number}' is not a phone number.\nPlease use format: '+38-0XX-XXX-XX-XX'"
+            if username in self._book.phone_owners(number):
                 raise ValueError(f"Contact with name '{username}' and phone {number} already exist in phonebook")
+            self._book.check_phone_is_free(number, username)
             current_record.add_to_phone_field(Phone(number))
             return f"Phone '{number}' was added successfully to existing contact'{username}'"
         else:
@@ -402,15 +935,14 @@ class CommandLineInterface:
     def add_birthday_handler(self, username: str, birthday: str):
         if self._book.find_by_name(username):
             current_record: Record = self._book.find_by_name(username)
-            if current_record.birthday.value is not None:
-                user_decision = input(f"In contact with name '{username}' "
-                                      f"is already indicated birthday '{current_record.birthday.value}"
-                                      f"Do you want to change it? Please print 'yes' or 'no': ")
-                if user_decision == "yes":
+            if current_record.has_birthday():
+                if self.ask(f"In contact with name '{username}' "
+                            f"is already indicated birthday '{current_record.birthday.value}"
+                            f"Do you want to change it? Please print 'yes' or 'no': "):
                     current_record.add_to_birthday_field(birthday=Birthday(birthday))
                     return f"For contact'{username}' birthday was changed successfully to new '{birthday}'"
                 else:
-                    pass
+                    return f"Birthday of contact '{username}' was not changed"
             current_record.add_to_birthday_field(Birthday(birthday))
             return f"Birthday '{birthday}' was added successfully to contact'{username}'"
         else:
@@ -424,6 +956,7 @@ class CommandLineInterface:
             new_phone = Phone(new_number)
             if old_phone is not None:
                 if self.phone_validity(old_number) and self.phone_validity(new_number):
+                    self._book.check_phone_is_free(new_number, username)
                     current_record.change_in_phone_field(old_phone, new_phone)
                     return f"Number for contact '{username}' was changed successfully to '{new_number}'"
                 else:
@@ -465,7 +998,7 @@ class CommandLineInterface:
     def delete_birthday_handler(self, username: str):
         if self._book.find_by_name(username):
             current_record: Record = self._book.find_by_name(username)
-            if current_record.birthday.value is not None:
+            if current_record.has_birthday():
                 current_record.delete_from_birthday_field()
                 return f"For contact'{username}' birthday was deleted successfully "
             else:
@@ -477,29 +1010,167 @@ class CommandLineInterface:
     def days_to_birthday_handler(self, username: str):
         if self._book.find_by_name(username):
             current_record: Record = self._book.find_by_name(username)
-            if current_record.birthday.value is not None:
-                current_record.days_to_birthday()
+            if current_record.has_birthday():
+                days_left = current_record.days_to_birthday()
+                return f"{days_left} days are left to the birthday of contact '{username}'"
             else:
                 return f"Contact with name '{username}' does not contain any birthday."
         else:
             raise ValueError(f"Contact with name '{username}' does not exist in phonebook.")
 
+    @command_error_handler
+    def upcoming_birthdays_handler(self, days: int):
+        upcoming = self._book.upcoming_birthdays(days)
+        if len(upcoming) == 0:
+            return f"There are no birthdays in the next {days} days."
+        first_string = f"Birthdays in the next {days} days:\n"
+        contact_lines = "\n".join(
+            f"in {days_left} days: {record.name.value} ({record.birthday})" for days_left, record in upcoming
+        )
+        return first_string + contact_lines
+
     @command_error_handler
     def phone_handler(self, username: str):
         if self._book.find_by_name(username):
             current_record: Record = self._book.find_by_name(username)
-            return str(current_record)
+            return self.render([current_record])
         else:
             raise ValueError(f"Contact with name '{username}' does not exist in phonebook.")
 
     @command_error_handler
-    def show_all_handler(self, *args):
+    def whois_handler(self, number: str):
+        if not self.phone_validity(number):
+            return f"Entered '{number}' is not a phone number.\nPlease use format: '+38-0XX-XXX-XX-XX'"
+        owners = self._book.find_by_phone(number)
+        if len(owners) == 0:
+            return f"Phone '{number}' does not belong to any contact in phonebook."
+        return f"Phone '{number}' belongs to: " + ", ".join(record.name.value for record in owners)
+
+    @command_error_handler
+    def import_handler(self, file_name: str, workers: int = 1):
+        # modules of commands that are rarely used are imported when they are needed, so start is faster
+        from batch import import_contacts
+
+        imported, rejected, errors_file = import_contacts(self._book, file_name, workers=workers)
+        if rejected > 0:
+            return f"{imported} contacts were imported from '{file_name}'.\n" \
+                   f"{rejected} rows were rejected, details are saved to '{errors_file}'"
+        return f"{imported} contacts were imported from '{file_name}'"
+
+    @command_error_handler
+    def export_handler(self, file_name: str):
+        from batch import export_contacts
+
+        exported = export_contacts(self._book, file_name)
+        return f"{exported} contacts were exported to '{file_name}'"
+
+    @command_error_handler
+    def show_all_handler(self, page: int = None, sort_by_name: bool = False):
         if len(self._book) == 0:
             return "Your phonebook is empty yet. Please add new contacts."
+        page_count = self._book.page_count(self.page_size)
+        if page is not None:
+            if not 1 <= page <= page_count:
+                raise ValueError(f"Page {page} does not exist. Your phonebook has {page_count} pages.")
+            records = next(self._book.pages(self.page_size, sort_by_name, start_page=page - 1))
+            return f"Page {page} of {page_count}:\n" + self.render(records)
+        return self._stream_pages(page_count, sort_by_name)
+
+    def _stream_pages(self, page_count: int, sort_by_name: bool):
+        # pages are printed one by one, interactive user is asked before each next page
+        yield "Your phonebook has the following contacts:"
+        for number, records in enumerate(self._book.pages(self.page_size, sort_by_name), start=1):
+            if number > 1 and self._answer is None and not self.ask(
+                    f"Show page {number} of {page_count}? Please print 'yes' or 'no': "):
+                return
+            yield self.render(records)
+
+    @command_error_handler
+    def stats_handler(self, file_name: str = None):
+        if file_name is not None:
+            metrics.dump(file_name)
+            return f"Statistics of commands were saved to '{file_name}'"
+        return metrics.summary()
+
+    @command_error_handler
+    def profile_handler(self, user_input: str):
+        # runs one command under cProfile and shows the functions it spent time in after its output
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.execute(user_input)
+            blocks = [str(response)] if response is None or isinstance(response, str) else list(response)
+        finally:
+            profiler.disable()
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(15)
+        return "\n".join(blocks) + "\n" + report.getvalue()
+
+    @command_error_handler
+    def undo_handler(self):
+        step = self._book.undo()
+        if step is None:
+            return "There are no changes to undo."
+        return f"Undone {History.describe(step)}: " + self._describe_changes(step)
+
+    @command_error_handler
+    def redo_handler(self):
+        step = self._book.redo()
+        if step is None:
+            return "There are no undone changes to redo."
+        return f"Redone {History.describe(step)}: " + self._describe_changes(step)
+
+    @staticmethod
+    def _describe_changes(step: dict) -> str:
+        names = list(dict.fromkeys(change["name"] for change in step["changes"]))
+        if len(names) > 5:
+            return f"{len(names)} contacts"
+        return "contacts " + ", ".join(f"'{name}'" for name in names)
+
+    @command_error_handler
+    def history_handler(self, username: str):
+        changes = self._book.history(username)
+        if len(changes) == 0:
+            return f"There are no changes of contact '{username}' that could be undone."
+        lines = [f"Changes of contact '{username}', the oldest first:"]
+        for step, change in changes:
+            lines.append(f"{History.describe(step)}: {self._describe_state(change['before'])} -> "
+                         f"{self._describe_state(change['after'])}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _describe_state(state: dict | None) -> str:
+        if state is None:
+            return "(no contact)"
+        phones = " ".join(phone for phone in state["phone"] if phone is not None) or "no phones"
+        birthday = f", birthday {state['birthday']}" if state["birthday"] is not None else ""
+        return phones + birthday
+
+    @command_error_handler
+    def dedupe_handler(self, apply: bool = False):
+        from dedupe import find_duplicates, merge_duplicates
+
+        report = find_duplicates(self._book)
+        lines = [f"{report.comparisons} pairs of {report.contacts} contacts were compared in {report.blocks} blocks"
+                 + (f", {report.skipped_blocks} blocks of more than {report.max_block_size} contacts were skipped"
+                    if report.skipped_blocks else "") + "."]
+        if len(report.groups) == 0:
+            return lines[0] + "\nNo duplicate contacts were found."
+        lines.append(f"{len(report.groups)} groups of duplicate contacts were found:")
+        for group in report.groups:
+            lines.append(f"'{group[0]}' <- " + ", ".join(f"'{key}'" for key in group[1:])
+                         + f" ({report.reasons[group[0]]})")
+        if apply:
+            deleted = merge_duplicates(self._book, report.groups)
+            lines.append(f"Phones and birthdays were merged into the first contact of every group, "
+                         f"{deleted} duplicate contacts were deleted.")
         else:
-            first_string = "Your phonebook has the following contacts:\n"
-            contact_lines = "\n".join(str(record) for record in list(self._book.data.values()))
-            return first_string + contact_lines
+            lines.append("Run 'dedupe --apply' to merge phones and birthdays into the first contact of every group "
+                         "and delete the others.")
+        return "\n".join(lines)
 
     @command_error_handler
     def exit_handler(self, *args):
@@ -508,21 +1179,101 @@ class CommandLineInterface:
     @command_error_handler
     def find_handler(self, pattern):
         first_string = "The following contacts match the search:\n"
-        contact_lines = "\n".join(
-            str(record) for record in list(self._book.find_by_pattern(pattern))
-        )
-        if len(contact_lines) > 0:
-            return first_string + contact_lines
+        matched_contacts = self._book.find_by_pattern(pattern)
+        if len(matched_contacts) > 0:
+            return first_string + self.render(matched_contacts)
         else:
             return "Your phonebook doesn't contain the contacts that are matching to search."
 
+    @command_error_handler
+    def fuzzy_handler(self, username: str, limit: int = 5):
+        similar = self._book.find_fuzzy(username, limit)
+        if len(similar) == 0:
+            return f"Your phonebook doesn't contain the contacts with names similar to '{username}'."
+        first_string = f"The closest contacts to '{username}':\n"
+        contact_lines = "\n".join(
+            f"{record.render(self.output_format)} (distance {distance})" for distance, record in similar
+        )
+        return first_string + contact_lines
+
     def setup_book(self, book):
         self._book = book
 
+    def start_autosave(self):
+        if self.autosave > 0:
+            self._book.start_autosave(self.autosave, self.autosave_changes)
+
+    def execute(self, user_input: str):
+        result = self._parsers.parse_user_input(user_input=user_input)
+        if isinstance(result, str):
+            return result
+        command, arguments = result
+        return self.handle(command, arguments)
+
+    def handle(self, command: str, arguments: list):
+        command_handler = getattr(self, command.replace(" ", "_") + "_handler")
+        if command in ("undo", "redo"):
+            return command_handler(*arguments)
+        # changes of one command are undone together
+        with self._book.step(" ".join([command, *(str(argument) for argument in arguments
+                                                   if argument is not None and not isinstance(argument, bool))])):
+            return command_handler(*arguments)
+
+    @staticmethod
+    def print_response(command_response):
+        # handlers with long output return generator of text blocks, which are printed as they are ready
+        if command_response is None or isinstance(command_response, str):
+            print(command_response)
+        else:
+            for block in command_response:
+                print(block)
+
+    def run_script(self, lines, output=sys.stdout, flush_every: int = 1000):
+        # commands are run without prompts, output is written by blocks and book is saved once at the end
+        with AddressBook(journal=False, backend=self.backend, unique_phones=self.unique_phones, history=self.history,
+                         keep_history=self.keep_history) as book:
+            self.setup_book(book)
+            self.start_autosave()
+            buffer = io.StringIO()
+            with redirect_stdout(buffer):
+                for number, line in enumerate(lines, start=1):
+                    if len(line.strip()) == 0 or line.lstrip().startswith("#"):
+                        continue
+                    try:
+                        self.print_response(self.execute(line))
+                    except SystemExit as e:
+                        print(str(e))
+                        break
+                    if number % flush_every == 0:
+                        output.write(buffer.getvalue())
+                        buffer.seek(0)
+                        buffer.truncate()
+            output.write(buffer.getvalue())
+            output.flush()
+
+    def run_once(self, user_input: str) -> bool:
+        # one command from command line without greeting and help: book is opened lazily (records are made
+        # when the command uses them), read-only when the command does not change it; returns False
+        # when command is not recognized
+        result = self._parsers.parse_user_input(user_input=user_input)
+        if isinstance(result, str):
+            return False
+        command, arguments = result
+        with AddressBook(backend=self.backend, unique_phones=self.unique_phones, history=self.history,
+                         keep_history=self.keep_history, lazy=True, read_only=command not in write_commands) as book:
+            self.setup_book(book)
+            try:
+                self.print_response(self.handle(command, arguments))
+            except SystemExit as e:
+                print(str(e))
+        return True
+
     def run_program(self):
 
-        with AddressBook() as book:
+        with AddressBook(backend=self.backend, unique_phones=self.unique_phones, history=self.history,
+                         keep_history=self.keep_history) as book:
             self.setup_book(book)
+            self.start_autosave()
 
             name_input = input("Hello! What is your name?\nPlease enter: ")
             print(f"\n{name_input.lower().capitalize()}, nice to meet you. let's start.\n")
@@ -539,28 +1290,112 @@ class CommandLineInterface:
     - delete phone "name" "phone-number" -> to delete phone from the contact with this name;
     - delete birthday "name" -> to delete the birthday from the contact with this name;
     - days to birthday "name" -> to check how many days are left fot the contact's birthday (if indicated b/d);
+    - upcoming birthdays "days" -> to see contacts whose birthday is in the next entered number of days;
     - phone "name" -> to see the phone numbers for the contact with this name (if exist);
-    - show all -> to see all contacts in your phonebook (if you have added at least 1);
+    - show all "*--page N" "*--sort" -> to see all contacts in your phonebook (if you have added at least 1)
+                                        page by page, or only page N, sorted by name with --sort;
+    - whois "phone" -> to see contacts with this phone number;
     - find "name" or "phone" -> to find contacts that are matching to entered key-letters or key-digits;
+    - fuzzy "name" "*count" -> to find contacts with names similar to entered one (with typos or in Cyrillic),
+                               5 closest by default;
+    - import "file" "*workers" -> to load contacts from .csv or .jsonl file (columns: name, phone, birthday),
+                                  rejected rows are saved to "file.errors.jsonl";
+    - export "file" -> to save all contacts to .csv or .jsonl file;
+    - stats "*file" -> to see count, errors and time of commands, or save them to .json or Prometheus text file;
+    - profile "command" -> to run the command and see in which functions it spent time;
+    - dedupe "*--apply" -> to find contacts that are probably the same person (similar names with the same phone
+                          or birthday), with --apply to merge them;
+    - undo / redo -> to cancel the last change of phonebook (one command) or to make cancelled change again;
+    - history "name" -> to see changes of the contact with this name that could be undone;
     - good bye / close / exit -> to finish work and close session;
     """)
 
             while True:
                 user_input = input("Please enter command: ")
-                result = self._parsers.parse_user_input(user_input=user_input)
-                if len(result) != 2:
-                    print(result)
-                    continue
-                command, arguments = result
-                command_handler = getattr(self, command.replace(" ", "_") + "_handler")
                 try:
-                    command_response = command_handler(*arguments)
-                    print(command_response)
+                    self.print_response(self.execute(user_input))
                 except SystemExit as e:
                     print(str(e))
                     break
 
 
+def parse_arguments(argv=None):
+    # options of the assistant go before the command, everything after the first word of the command is its own
+    # (e.g. 'show all --page 2'), so options are not abbreviated and not taken from the command
+    parser = argparse.ArgumentParser(description="Phonebook assistant", allow_abbrev=False)
+    parser.add_argument("command", nargs=argparse.REMAINDER,
+                        help="command to run once and exit, e.g. 'phone Andrii'; the book is not saved "
+                             "when the command does not change it")
+    parser.add_argument("--script", help="file with commands, one per line; commands are read from stdin pipe too")
+    parser.add_argument("--answer", choices=("yes", "no"),
+                        help="answer to yes/no questions of commands ('no' by default in script mode)")
+    parser.add_argument("--page-size", type=int, default=20, help="number of contacts on a page of 'show all'")
+    parser.add_argument("--backend", choices=tuple(storages), default="binary", help="storage of the phonebook")
+    parser.add_argument("--format", choices=output_formats, default="text", help="format of contacts in output")
+    parser.add_argument("--profile", help="file to save cProfile statistics of the whole session")
+    parser.add_argument("--phone-plan", action="append", metavar="PREFIX:DIGITS",
+                        help="country code and number of digits of valid phones, '380:12' by default; "
+                             "could be repeated for several countries")
+    parser.add_argument("--metrics", help="file to save statistics of commands at the end (.json or Prometheus text)")
+    parser.add_argument("--autosave", type=float, default=60,
+                        help="seconds between background saves of changed book, 0 to save only on exit")
+    parser.add_argument("--autosave-changes", type=int, default=1000,
+                        help="number of changes that starts background save before the interval ends")
+    parser.add_argument("--shards", type=int,
+                        help="worker processes of '--backend sharded', one per processor by default")
+    parser.add_argument("--history", type=int, default=100, help="number of commands that could be undone, 0 - no undo")
+    parser.add_argument("--keep-history", action="store_true",
+                        help="keep commands that could be undone in '<book file>.history' between sessions")
+    parser.add_argument("--unique-phones", action="store_true",
+                        help="one phone number could belong to one contact only")
+    return parser.parse_args(argv)
+
+
+def run(arguments):
+    if arguments.shards is not None:
+        ShardedStorage.shards = arguments.shards
+    if arguments.phone_plan:
+        set_phone_plans({prefix: int(digits) for prefix, digits in (plan.split(":") for plan in arguments.phone_plan)})
+    if arguments.command:
+        cli = CommandLineInterface(answer=arguments.answer or "no", page_size=arguments.page_size,
+                                   backend=arguments.backend, output_format=arguments.format,
+                                   history=arguments.history, keep_history=arguments.keep_history,
+                                   unique_phones=arguments.unique_phones)
+        if not cli.run_once(" ".join(arguments.command)):
+            sys.exit(2)
+    elif arguments.script is not None or not sys.stdin.isatty():
+        cli = CommandLineInterface(answer=arguments.answer or "no", page_size=arguments.page_size,
+                                   backend=arguments.backend, output_format=arguments.format,
+                                   autosave=arguments.autosave, autosave_changes=arguments.autosave_changes,
+                                   history=arguments.history, keep_history=arguments.keep_history,
+                                   unique_phones=arguments.unique_phones)
+        if arguments.script is not None:
+            with open(arguments.script, "r", encoding="utf-8") as script:
+                cli.run_script(script)
+        else:
+            cli.run_script(sys.stdin)
+    else:
+        cli = CommandLineInterface(answer=arguments.answer, page_size=arguments.page_size,
+                                   backend=arguments.backend, output_format=arguments.format,
+                                   autosave=arguments.autosave, autosave_changes=arguments.autosave_changes,
+                                   history=arguments.history, keep_history=arguments.keep_history,
+                                   unique_phones=arguments.unique_phones)
+        cli.run_program()
+
+
 if __name__ == "__main__":
-    cli = CommandLineInterface()
-    cli.run_program()
+    arguments = parse_arguments()
+    profiler = None
+    if arguments.profile is not None:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        run(arguments)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(arguments.profile)
+        if arguments.metrics is not None:
+            metrics.dump(arguments.metrics)
@@ -0,0 +1,117 @@
+from bisect import bisect_left
+import json
+import threading
+import time
+
+# upper bounds of latency buckets, seconds; the last bucket is for everything slower
+latency_buckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class CommandStats:
+    __slots__ = ("count", "errors", "total", "slowest", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.buckets = [0] * (len(latency_buckets) + 1)
+
+    def quantile(self, share: float) -> float:
+        # upper bound of the bucket where the quantile is, but not more than the slowest call
+        rank = share * self.count
+        passed = 0
+        for position, count in enumerate(self.buckets):
+            passed += count
+            if passed >= rank and count > 0:
+                return min(latency_buckets[position], self.slowest) if position < len(latency_buckets) \
+                    else self.slowest
+        return 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "seconds": self.total,
+            "slowest": self.slowest,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([*map(str, latency_buckets), "+Inf"], self.buckets)),
+        }
+
+
+class CommandMetrics:
+    # counts, errors and latency histograms of commands; shared by all sessions of the process
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._commands = {}
+
+    def record(self, command: str, seconds: float, failed: bool = False):
+        with self._lock:
+            stats = self._commands.get(command)
+            if stats is None:
+                stats = self._commands[command] = CommandStats()
+            stats.count += 1
+            stats.total += seconds
+            stats.buckets[bisect_left(latency_buckets, seconds)] += 1
+            if failed:
+                stats.errors += 1
+            if seconds > stats.slowest:
+                stats.slowest = seconds
+
+    def timed_stream(self, command: str, blocks, started: float):
+        # commands with long output return generator, the time of all its blocks is counted
+        failed = True
+        try:
+            yield from blocks
+            failed = False
+        finally:
+            self.record(command, time.perf_counter() - started, failed)
+
+    def clear(self):
+        with self._lock:
+            self._commands.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {command: stats.to_dict() for command, stats in sorted(self._commands.items())}
+
+    def summary(self) -> str:
+        lines = [f"{'command':<20} {'count':>8} {'errors':>8} {'p50, ms':>10} {'p99, ms':>10} {'max, ms':>10}"]
+        for command, stats in self.snapshot().items():
+            errors = f"{stats['errors'] / stats['count']:.0%}" if stats["errors"] else "0"
+            lines.append(f"{command:<20} {stats['count']:>8} {errors:>8} {stats['p50'] * 1000:>10.2f} "
+                         f"{stats['p99'] * 1000:>10.2f} {stats['slowest'] * 1000:>10.2f}")
+        return "\n".join(lines)
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP phonebook_command_duration_seconds Time of phonebook commands.",
+            "# TYPE phonebook_command_duration_seconds histogram",
+        ]
+        snapshot = self.snapshot()
+        for command, stats in snapshot.items():
+            cumulative = 0
+            for bound, count in stats["buckets"].items():
+                cumulative += count
+                lines.append(f'phonebook_command_duration_seconds_bucket{{command="{command}",le="{bound}"}} '
+                             f'{cumulative}')
+            lines.append(f'phonebook_command_duration_seconds_sum{{command="{command}"}} {stats["seconds"]}')
+            lines.append(f'phonebook_command_duration_seconds_count{{command="{command}"}} {stats["count"]}')
+        lines.append("# HELP phonebook_command_errors_total Commands that failed with error.")
+        lines.append("# TYPE phonebook_command_errors_total counter")
+        for command, stats in snapshot.items():
+            lines.append(f'phonebook_command_errors_total{{command="{command}"}} {stats["errors"]}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, file_name: str):
+        # .json file gets json, any other file gets Prometheus text format
+        with open(file_name, "w", encoding="utf-8") as file:
+            if file_name.lower().endswith(".json"):
+                json.dump(self.snapshot(), file, indent=2)
+            else:
+                file.write(self.prometheus_text())
+
+
+metrics = CommandMetrics()
@@ -0,0 +1,180 @@
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import json
+
+from main import AddressBook, CommandLineInterface, UserInputParser, output_formats, write_commands
+from shards import ShardedStorage
+from storage import storages
+
+incorrect_input = "Incorrect input.\nPlease check details and enter correct command."
+
+
+class ReadWriteLock:
+    # many readers or one writer; readers wait while a writer is waiting, so writes are not starved
+
+    def __init__(self):
+        self._condition = asyncio.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @asynccontextmanager
+    async def reading(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writer and self._waiting_writers == 0)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._readers -= 1
+                self._condition.notify_all()
+
+    @asynccontextmanager
+    async def writing(self):
+        async with self._condition:
+            self._waiting_writers += 1
+            try:
+                await self._condition.wait_for(lambda: not self._writer and self._readers == 0)
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+class PhonebookServer:
+    # line protocol: client sends one command per line, server answers with one json line {"response": "..."}
+
+    def __init__(self, book: AddressBook, answer: str = "no", page_size: int = 20, workers: int = 8,
+                 output_format: str = "text"):
+        self._book = book
+        self._parser = UserInputParser()
+        self._lock = ReadWriteLock()
+        # handlers run in threads, so a long import or save does not stop other connections
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self.answer = answer
+        self.page_size = page_size
+        self.output_format = output_format
+
+    def session(self) -> CommandLineInterface:
+        # every connection has its own interface with the shared book
+        session = CommandLineInterface(answer=self.answer, page_size=self.page_size, output_format=self.output_format)
+        session.setup_book(self._book)
+        return session
+
+    @staticmethod
+    def encode(response: str) -> bytes:
+        return (json.dumps({"response": response}, ensure_ascii=False) + "\n").encode("utf-8")
+
+    @staticmethod
+    def run_handler(session: CommandLineInterface, command: str, arguments: list) -> str:
+        response = session.handle(command, arguments)
+        if response is None or isinstance(response, str):
+            return response
+        # pages of 'show all' are read while the lock is held
+        return "\n".join(response)
+
+    async def execute(self, session: CommandLineInterface, command: str, arguments: list) -> str:
+        lock = self._lock.writing() if command in write_commands else self._lock.reading()
+        async with lock:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.run_handler, session, command, arguments
+            )
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = self.session()
+        try:
+            while line := await reader.readline():
+                user_input = line.decode("utf-8", errors="replace").strip()
+                if len(user_input) == 0:
+                    continue
+                try:
+                    command, arguments = self._parser.parse(user_input)
+                except (ValueError, KeyError, TypeError):
+                    writer.write(self.encode(incorrect_input))
+                    await writer.drain()
+                    continue
+                if command == "exit":
+                    try:
+                        session.exit_handler()
+                    except SystemExit as e:
+                        writer.write(self.encode(str(e)))
+                    break
+                writer.write(self.encode(await self.execute(session, command, arguments)))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        address = server.sockets[0].getsockname()
+        print(f"Phonebook is served on {address[0]}:{address[1]}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        # handlers that are still running finish before the book is saved
+        self._executor.shutdown(wait=True)
+
+
+def run_server(host: str, port: int, backend: str = "binary", answer: str = "no", page_size: int = 20,
+               workers: int = 8, output_format: str = "text", autosave: float = 60, autosave_changes: int = 1000,
+               history: int = 100, keep_history: bool = False, unique_phones: bool = False):
+    # 'undo' of any session cancels the last change of the shared book
+    with AddressBook(backend=backend, unique_phones=unique_phones, history=history, keep_history=keep_history) as book:
+        if autosave > 0:
+            book.start_autosave(autosave, autosave_changes)
+        server = PhonebookServer(book, answer=answer, page_size=page_size, workers=workers,
+                                 output_format=output_format)
+        try:
+            asyncio.run(server.serve(host, port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Phonebook assistant server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 to choose free port")
+    parser.add_argument("--backend", choices=tuple(storages), default="binary", help="storage of the phonebook")
+    parser.add_argument("--answer", choices=("yes", "no"), default="no", help="answer to yes/no questions of commands")
+    parser.add_argument("--page-size", type=int, default=20, help="number of contacts on a page of 'show all'")
+    parser.add_argument("--workers", type=int, default=8, help="threads running command handlers")
+    parser.add_argument("--format", choices=output_formats, default="text", help="format of contacts in output")
+    parser.add_argument("--autosave", type=float, default=60,
+                        help="seconds between background saves of changed book, 0 to save only on exit")
+    parser.add_argument("--autosave-changes", type=int, default=1000,
+                        help="number of changes that starts background save before the interval ends")
+    parser.add_argument("--shards", type=int,
+                        help="worker processes of '--backend sharded', one per processor by default")
+    parser.add_argument("--history", type=int, default=100, help="number of commands that could be undone, 0 - no undo")
+    parser.add_argument("--keep-history", action="store_true",
+                        help="keep commands that could be undone in '<book file>.history' between sessions")
+    parser.add_argument("--unique-phones", action="store_true",
+                        help="one phone number could belong to one contact only")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    if arguments.shards is not None:
+        ShardedStorage.shards = arguments.shards
+    run_server(arguments.host, arguments.port, backend=arguments.backend, answer=arguments.answer,
+               page_size=arguments.page_size, workers=arguments.workers, output_format=arguments.format,
+               autosave=arguments.autosave, autosave_changes=arguments.autosave_changes,
+               history=arguments.history, keep_history=arguments.keep_history, unique_phones=arguments.unique_phones)
@@ -0,0 +1,416 @@
+from collections.abc import MutableMapping, Sequence
+from contextlib import contextmanager
+import heapq
+from itertools import chain, count
+import os
+import threading
+import weakref
+import zlib
+
+from indexes import BirthdayIndex, FuzzyIndex, PatternIndex, PhoneIndex, edit_distance
+from storage import BinaryStorage, BinaryStore, storages
+
+
+def shard_of(key, shards: int) -> int:
+    return zlib.crc32(str(key).encode("utf-8")) % shards
+
+
+class Shard:
+    # requests of ShardedRecords answered by worker process over its part of the book;
+    # records travel between processes as Record.to_dict() states or rows of 'binary' storage,
+    # answers of queries are keys only
+
+    # scans that are not read to the end are forgotten, the oldest first
+    max_scans = 8
+
+    def __init__(self, book):
+        self.book = book
+        self._scans = {}
+
+    def load(self, file_name: str, shard: int, shards: int) -> int:
+        # every worker reads the snapshot of 'binary' storage itself and makes records of its own shard only
+        for row in BinaryStore.read(file_name):
+            if shard_of(row[0], shards) == shard:
+                self.book.data[row[0]] = self.book._load_record(row)
+        return len(self.book.data)
+
+    def put(self, states: list):
+        for state in states:
+            self.book[state["name"]] = self.book._load_record(state)
+
+    def delete(self, key) -> bool:
+        if key not in self.book.data:
+            return False
+        del self.book[key]
+        return True
+
+    def get(self, key):
+        record = self.book.data.get(key)
+        return record.to_dict() if record is not None else None
+
+    def get_many(self, keys: list) -> list:
+        # rows of 'binary' storage (key, name, phone numbers, birthday ordinal) are smaller and faster to load
+        rows = []
+        for key in keys:
+            record = self.book.data.get(key)
+            if record is None:
+                rows.append(None)
+                continue
+            birthday = record.birthday._value if record.birthday is not None else None
+            rows.append((key, record.name.value, [phone._value for phone in record.phone], birthday))
+        return rows
+
+    def contains(self, key) -> bool:
+        return key in self.book.data
+
+    def length(self) -> int:
+        return len(self.book.data)
+
+    def names(self) -> list:
+        return list(self.book.data)
+
+    def open_scan(self, scan_id: int, sort_by_name: bool):
+        if len(self._scans) >= self.max_scans:
+            self._scans.pop(next(iter(self._scans)))
+        self._scans[scan_id] = sorted(self.book.data) if sort_by_name else list(self.book.data)
+
+    def scan(self, scan_id: int, start: int, count: int) -> tuple[list, bool]:
+        # states of the next keys of the scan and whether the scan is over
+        keys = self._scans.get(scan_id, [])
+        chunk = keys[start:start + count]
+        done = start + count >= len(keys)
+        if done:
+            self._scans.pop(scan_id, None)
+        return [self.book.data[key].to_dict() for key in chunk if key in self.book.data], done
+
+    def close_scan(self, scan_id: int):
+        self._scans.pop(scan_id, None)
+
+    def find_by_pattern(self, pattern) -> list:
+        keys, exact = self.book._index(PatternIndex).search(pattern)
+        return keys if exact else [key for key in keys if self.book.data[key].match_pattern(pattern)]
+
+    def phone_owners(self, number: int) -> list:
+        return list(self.book._index(PhoneIndex).owners(number))
+
+    def upcoming(self, days: int, today) -> list:
+        return self.book._index(BirthdayIndex).upcoming(days, today)
+
+    def fuzzy(self, name, limit: int) -> list:
+        return self.book._index(FuzzyIndex).search(name, limit)
+
+
+def serve_shard(connection):
+    # worker process: keeps one shard in AddressBook with its own indexes until 'close' request
+    from main import AddressBook
+
+    shard = Shard(AddressBook(journal=False, history=0))
+    while True:
+        method, arguments = connection.recv()
+        if method == "close":
+            connection.close()
+            return
+        try:
+            connection.send((True, getattr(shard, method)(*arguments)))
+        except Exception as e:
+            connection.send((False, f"{type(e).__name__}: {e}"))
+
+
+class ShardedRecords(MutableMapping):
+    # dict-like view over shards in worker processes: contact goes to shard by crc32 of its name,
+    # point requests go to one shard, queries are sent to all shards at once and their answers are merged
+
+    def __init__(self, shards: int, loader=None):
+        # multiprocessing is imported only when sharded book is opened, it is not needed by other backends
+        import multiprocessing
+
+        self._loader = loader
+        self._cache = weakref.WeakValueDictionary()
+        # puts of bulk() that are not sent yet
+        self._pending = None
+        # sessions of the server share the book, while one request and its answer go through pipes at once
+        self._lock = threading.RLock()
+        self._scan_ids = count()
+        self._connections = []
+        self._processes = []
+        for _ in range(max(shards, 1)):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=serve_shard, args=(worker_connection,), daemon=True)
+            process.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+
+    def _shard(self, key) -> int:
+        return shard_of(key, len(self._connections))
+
+    @staticmethod
+    def _answer(connection):
+        succeeded, result = connection.recv()
+        if not succeeded:
+            raise RuntimeError(f"Shard failed: {result}")
+        return result
+
+    def _call(self, shard: int, method: str, *arguments):
+        with self._lock:
+            self._flush()
+            self._connections[shard].send((method, arguments))
+            return self._answer(self._connections[shard])
+
+    def _scatter(self, method: str, *arguments) -> list:
+        # all shards work on the request together, answers are read in order of shards
+        with self._lock:
+            self._flush()
+            for connection in self._connections:
+                connection.send((method, arguments))
+            return [self._answer(connection) for connection in self._connections]
+
+    def _flush(self):
+        if not self._pending:
+            return
+        by_shard = {}
+        for key, record in self._pending.items():
+            by_shard.setdefault(self._shard(key), []).append(record.to_dict())
+        self._pending = {}
+        for shard, states in by_shard.items():
+            self._connections[shard].send(("put", (states,)))
+        for shard in by_shard:
+            self._answer(self._connections[shard])
+
+    @contextmanager
+    def bulk(self):
+        # puts are sent to shards in batches at the end or before the next request
+        with self._lock:
+            self._pending = {}
+            try:
+                yield
+            finally:
+                self._flush()
+                self._pending = None
+
+    def load(self, file_name: str):
+        # shards read the file together, no record of the book is made in this process
+        with self._lock:
+            for shard, connection in enumerate(self._connections):
+                connection.send(("load", (file_name, shard, len(self._connections))))
+            answers = [connection.recv() for connection in self._connections]
+        for succeeded, result in answers:
+            if not succeeded:
+                raise RuntimeError(f"Shard failed: {result}")
+
+    def _materialize(self, key, state):
+        record = self._cache.get(key)
+        if record is None:
+            record = self._loader(state)
+            self._cache[key] = record
+        return record
+
+    def fetch(self, keys: list) -> list:
+        # records of keys in their order, the ones not in memory are asked with one request per shard
+        records = [self._cache.get(key) for key in keys]
+        by_shard = {}
+        for position, record in enumerate(records):
+            if record is None:
+                by_shard.setdefault(self._shard(keys[position]), []).append(position)
+        if not by_shard:
+            return records
+        with self._lock:
+            self._flush()
+            for shard, positions in by_shard.items():
+                self._connections[shard].send(("get_many", ([keys[position] for position in positions],)))
+            answers = {shard: self._connections[shard].recv() for shard in by_shard}
+        for shard, (succeeded, rows) in answers.items():
+            if not succeeded:
+                raise RuntimeError(f"Shard failed: {rows}")
+            for position, row in zip(by_shard[shard], rows):
+                if row is None:
+                    raise KeyError(keys[position])
+                records[position] = self._materialize(keys[position], row)
+        return records
+
+    def records_of(self, keys: list, labels: list = None) -> Sequence:
+        return FetchedRecords(self, keys, labels)
+
+    def __getitem__(self, key):
+        record = self._cache.get(key)
+        if record is None and self._pending:
+            record = self._pending.get(key)
+        if record is not None:
+            return record
+        state = self._call(self._shard(key), "get", key)
+        if state is None:
+            raise KeyError(key)
+        return self._materialize(key, state)
+
+    def __setitem__(self, key, record):
+        self._cache[key] = record
+        if self._pending is not None:
+            self._pending[key] = record
+            return
+        self._call(self._shard(key), "put", [record.to_dict()])
+
+    def __delitem__(self, key):
+        if not self._call(self._shard(key), "delete", key):
+            raise KeyError(key)
+        self._cache.pop(key, None)
+
+    def __contains__(self, key) -> bool:
+        if self._pending and key in self._pending:
+            return True
+        return self._call(self._shard(key), "contains", key)
+
+    def __len__(self) -> int:
+        return sum(self._scatter("length"))
+
+    def __iter__(self):
+        return chain.from_iterable(self._scatter("names"))
+
+    def _scans(self, sort_by_name: bool, chunk_size: int = 1000) -> list:
+        # generators of states of every shard, which are read by chunks; shards list (and sort) their keys together
+        scan_id = next(self._scan_ids)
+        self._scatter("open_scan", scan_id, sort_by_name)
+        return [self._scan(shard, scan_id, chunk_size) for shard in range(len(self._connections))]
+
+    def _scan(self, shard: int, scan_id: int, chunk_size: int):
+        start, done = 0, False
+        try:
+            while not done:
+                states, done = self._call(shard, "scan", scan_id, start, chunk_size)
+                start += chunk_size
+                yield from states
+        finally:
+            if not done:
+                self._call(shard, "close_scan", scan_id)
+
+    def items(self):
+        for state in chain.from_iterable(self._scans(sort_by_name=False)):
+            yield state["name"], self._materialize(state["name"], state)
+
+    def values(self):
+        return (record for _, record in self.items())
+
+    def sorted_values(self):
+        # every shard sorts its part, sorted parts are merged
+        for state in heapq.merge(*self._scans(sort_by_name=True), key=lambda state: state["name"]):
+            yield self._materialize(state["name"], state)
+
+    def index(self, index_class):
+        # queries are answered by indexes of shards, other indexes are built by book
+        shard_index = {
+            PatternIndex: ShardPatternIndex,
+            PhoneIndex: ShardPhoneIndex,
+            BirthdayIndex: ShardBirthdayIndex,
+            FuzzyIndex: ShardFuzzyIndex,
+        }.get(index_class)
+        return shard_index(self) if shard_index is not None else None
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            for connection in self._connections:
+                connection.send(("close", ()))
+                connection.close()
+            for process in self._processes:
+                process.join()
+
+
+class FetchedRecords(Sequence):
+    # answer of a query: records (or (label, record) pairs) of keys found by shards,
+    # they are fetched from shards by pages when the answer is read
+
+    page_size = 100
+
+    def __init__(self, records: ShardedRecords, keys: list, labels: list = None):
+        self._records = records
+        self._keys = keys
+        self._labels = labels
+        self._pages = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[item] for item in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("record index out of range")
+        page_number, offset = divmod(position, self.page_size)
+        page = self._pages.get(page_number)
+        if page is None:
+            start = page_number * self.page_size
+            page = self._pages[page_number] = self._records.fetch(self._keys[start:start + self.page_size])
+        return page[offset] if self._labels is None else (self._labels[position], page[offset])
+
+
+class ShardIndex:
+    # shards keep their indexes up to date, so changes of book are ignored
+
+    def __init__(self, records: ShardedRecords):
+        self._records = records
+
+    def add(self, key, record):
+        pass
+
+    def discard(self, key):
+        pass
+
+
+class ShardPatternIndex(ShardIndex):
+
+    def search(self, pattern: str) -> tuple[list, bool]:
+        # shards check matched records themselves, so the answer is exact
+        return list(chain.from_iterable(self._records._scatter("find_by_pattern", pattern))), True
+
+
+class ShardPhoneIndex(ShardIndex):
+
+    def owners(self, number: int) -> set:
+        return set(chain.from_iterable(self._records._scatter("phone_owners", number)))
+
+
+class ShardBirthdayIndex(ShardIndex):
+
+    def upcoming(self, days: int, today) -> list[tuple[int, str]]:
+        return list(heapq.merge(*self._records._scatter("upcoming", days, today)))
+
+
+class ShardFuzzyIndex(ShardIndex):
+
+    def search(self, name: str, limit: int = 5) -> list[tuple[int, str]]:
+        # the closest contacts of every shard are ordered again by the rules of FuzzyIndex.search
+        found = list(chain.from_iterable(self._records._scatter("fuzzy", name, limit)))
+        lower_name = str(name).lower()
+        found.sort(key=lambda item: (item[0], edit_distance(lower_name, item[1].lower()), item[1]))
+        return found[:limit]
+
+
+class ShardedStorage(BinaryStorage):
+    # the same files as 'binary' storage, contacts are kept by worker processes,
+    # one shard per processor unless ShardedStorage.shards is set (option --shards)
+    shards = os.cpu_count() or 1
+    lazy = True
+
+    def __init__(self):
+        self._records = None
+
+    def records(self, loader) -> MutableMapping:
+        self._records = ShardedRecords(self.shards, loader=loader)
+        return self._records
+
+    def open(self, loader) -> MutableMapping:
+        if not self.exists():
+            raise FileNotFoundError(self.file_name)
+        self._records.load(self.file_name)
+        return self._records
+
+    def write(self, records: MutableMapping):
+        super().write(dict(records.items()))
+
+    def close(self):
+        if self._records is not None:
+            self._records.close()
+
+
+storages["sharded"] = ShardedStorage
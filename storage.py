@@ -0,0 +1,866 @@
+from array import array
+from bisect import bisect_right
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from datetime import date
+from itertools import accumulate
+import json
+import mmap
+import os
+import pickle
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import weakref
+import zlib
+
+from indexes import BirthdayIndex, PatternIndex, PhoneIndex, calendar_walk
+from metrics import metrics
+
+
+class Journal:
+    # append-only log of book changes, one json entry per line:
+    # {"op": "put", "record": {...}} or {"op": "delete", "name": "..."}
+    # while snapshot is saved in background, entries before it wait in pending file (see rotate)
+
+    def __init__(self, file_name: str, sync: bool = False):
+        self.file_name = file_name
+        self.pending_name = file_name + ".pending"
+        self.sync = sync
+        self.entries = 0
+        self._file = None
+
+    def replay(self, repair: bool = True):
+        # repair=False leaves the file as it is, e.g. for a reader while other session may be writing it
+        for file_name in (self.pending_name, self.file_name):
+            try:
+                file = open(file_name, "rb")
+            except FileNotFoundError:
+                continue
+            with file:
+                # bytes of valid lines
+                valid = 0
+                for line in file:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError
+                        entry = json.loads(line)
+                    except ValueError:
+                        # torn tail after a crash, everything before it is valid
+                        break
+                    valid += len(line)
+                    self.entries += 1
+                    yield entry
+            if repair and valid < os.path.getsize(file_name):
+                # the tail is cut off, otherwise next entries would be appended to it and never replayed
+                os.truncate(file_name, valid)
+
+    def append(self, entry: dict):
+        if self._file is None:
+            self._file = open(self.file_name, "a", encoding="utf-8")
+        self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self.entries += 1
+
+    def truncate(self):
+        self.close()
+        with open(self.file_name, "w", encoding="utf-8"):
+            pass
+        self.drop_pending()
+        self.entries = 0
+
+    def rotate(self):
+        # entries written so far go to pending file until the snapshot with them is saved, new entries go
+        # to empty journal; replay of entries that are already in the snapshot gives the same book
+        self.close()
+        if not os.path.exists(self.file_name):
+            return
+        if os.path.exists(self.pending_name):
+            # previous save failed, its entries are still needed
+            with open(self.pending_name, "a", encoding="utf-8") as pending, \
+                    open(self.file_name, "r", encoding="utf-8") as file:
+                pending.write(file.read())
+            os.remove(self.file_name)
+        else:
+            os.replace(self.file_name, self.pending_name)
+        self.entries = 0
+
+    def drop_pending(self):
+        try:
+            os.remove(self.pending_name)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def atomic_write(file_name: str, write):
+    temp_name = file_name + ".tmp"
+    with open(temp_name, "wb") as file:
+        write(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_name, file_name)
+
+
+class AutoSaver:
+    # saves the book in background thread every interval seconds when it has changes, or at once when
+    # the number of changes reaches threshold; the thread that changes the book only counts changes,
+    # duration of every save is recorded in metrics as '(autosave)'
+
+    def __init__(self, book, interval: float = 60, threshold: int = 1000):
+        self.interval = interval
+        self.threshold = threshold
+        self.changes = 0
+        self.saves = 0
+        self.last_duration = None
+        self.last_error = None
+        self._book = book
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def changed(self):
+        self.changes += 1
+        if self.changes >= self.threshold:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopped:
+                return
+            if self.changes > 0:
+                self.save()
+
+    def save(self):
+        started = time.perf_counter()
+        failed = True
+        # changes made while the snapshot is written are counted for the next save
+        self.changes = 0
+        try:
+            self._book.save_snapshot(self._book.snapshot())
+            failed = False
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+        finally:
+            self.last_duration = time.perf_counter() - started
+            self.saves += 1
+            metrics.record("(autosave)", self.last_duration, failed)
+
+    def stop(self):
+        # save that is in progress is finished, changes after it are saved by the book on exit
+        self._stopped = True
+        self._wake.set()
+        self._thread.join()
+
+
+class MappedStore:
+    # read-only snapshot opened with mmap, records are decoded only when they are touched
+    # layout: header | records (name_len, json_len, name, json)...
+    #         | index of (offset, name_len, json_len) sorted by name
+    magic = b"PHBM"
+    version = 1
+    header = struct.Struct("<4sHQQ")
+    record_header = struct.Struct("<HI")
+    index_entry = struct.Struct("<QHI")
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self._file = open(file_name, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self._index_offset = self.header.unpack_from(self._map, 0)
+        if magic != self.magic or version != self.version:
+            self.close()
+            raise ValueError(f"File '{file_name}' is not a phonebook of version {self.version}")
+
+    @classmethod
+    def write(cls, file_name: str, items):
+        def write_records(file):
+            file.write(cls.header.pack(cls.magic, cls.version, 0, 0))
+            entries = []
+            offset = cls.header.size
+            for name, state in items:
+                name_bytes = name.encode("utf-8")
+                state_bytes = json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                file.write(cls.record_header.pack(len(name_bytes), len(state_bytes)))
+                file.write(name_bytes)
+                file.write(state_bytes)
+                entries.append((name_bytes, offset, len(state_bytes)))
+                offset += cls.record_header.size + len(name_bytes) + len(state_bytes)
+            entries.sort()
+            for name_bytes, record_offset, state_len in entries:
+                file.write(cls.index_entry.pack(record_offset, len(name_bytes), state_len))
+            file.seek(0)
+            file.write(cls.header.pack(cls.magic, cls.version, len(entries), offset))
+
+        atomic_write(file_name, write_records)
+
+    def _entry(self, position: int) -> tuple[bytes, int, int]:
+        offset, name_len, state_len = self.index_entry.unpack_from(
+            self._map, self._index_offset + position * self.index_entry.size
+        )
+        name_start = offset + self.record_header.size
+        return self._map[name_start:name_start + name_len], name_start + name_len, state_len
+
+    def _find(self, name: str):
+        key = name.encode("utf-8")
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry_name, state_offset, state_len = self._entry(middle)
+            if entry_name < key:
+                low = middle + 1
+            elif entry_name > key:
+                high = middle
+            else:
+                return state_offset, state_len
+        return None
+
+    def __contains__(self, name) -> bool:
+        return isinstance(name, str) and self._find(name) is not None
+
+    def get(self, name: str):
+        found = self._find(name)
+        if found is None:
+            return None
+        state_offset, state_len = found
+        return json.loads(self._map[state_offset:state_offset + state_len])
+
+    def scan(self):
+        offset = self.header.size
+        while offset < self._index_offset:
+            name_len, state_len = self.record_header.unpack_from(self._map, offset)
+            name_start = offset + self.record_header.size
+            state_start = name_start + name_len
+            name = self._map[name_start:state_start].decode("utf-8")
+            yield name, json.loads(self._map[state_start:state_start + state_len])
+            offset = state_start + state_len
+
+    def names(self):
+        offset = self.header.size
+        while offset < self._index_offset:
+            name_len, state_len = self.record_header.unpack_from(self._map, offset)
+            name_start = offset + self.record_header.size
+            yield self._map[name_start:name_start + name_len].decode("utf-8")
+            offset = name_start + name_len + state_len
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class BinaryStore:
+    # versioned columnar file, nothing in it depends on classes of the program:
+    # header (magic, version, number of columns, contacts, crc32 of columns) | columns
+    # every column is its array type code, item size, length in bytes and items (little-endian):
+    #   names - utf-8 string table of names, name lengths - u32 characters of every name,
+    #   keys and key lengths - the same for keys of the book, empty when keys are names,
+    #   phone counts - u16 phones of every contact, phones - i64 numbers (-1 for invalid number),
+    #   birthdays - i32 ordinal of date (0 for contact without birthday)
+    magic = b"PHBK"
+    version = 1
+    header = struct.Struct("<4sHHQI")
+    column_header = struct.Struct("<cBQ")
+    columns = (
+        ("names", "B"),
+        ("name lengths", "I"),
+        ("keys", "B"),
+        ("key lengths", "I"),
+        ("phone counts", "H"),
+        ("phones", "q"),
+        ("birthdays", "i"),
+    )
+
+    @classmethod
+    def write(cls, file_name: str, rows):
+        # rows are (key, name, phone numbers, birthday ordinal or None)
+        keys, names = [], []
+        phone_counts, phones, birthdays = array("H"), array("q"), array("i")
+        for key, name, numbers, ordinal in rows:
+            keys.append(key)
+            names.append(name)
+            phone_counts.append(len(numbers))
+            phones.extend(number if number is not None else -1 for number in numbers)
+            birthdays.append(ordinal or 0)
+        if keys == names:
+            keys = []
+        columns = [
+            array("B", "".join(names).encode("utf-8")),
+            array("I", map(len, names)),
+            array("B", "".join(keys).encode("utf-8")),
+            array("I", map(len, keys)),
+            phone_counts,
+            phones,
+            birthdays,
+        ]
+        chunks = []
+        for items in columns:
+            if sys.byteorder == "big":
+                items.byteswap()
+            data = items.tobytes()
+            chunks.append(cls.column_header.pack(items.typecode.encode("ascii"), items.itemsize, len(data)))
+            chunks.append(data)
+
+        def write_columns(file):
+            file.write(cls.header.pack(cls.magic, cls.version, len(columns), len(names), zlib.crc32(b"".join(chunks))))
+            for chunk in chunks:
+                file.write(chunk)
+
+        atomic_write(file_name, write_columns)
+
+    @classmethod
+    def read(cls, file_name: str):
+        # rows (key, name, phone numbers, birthday ordinal or None); damaged file or file of unknown
+        # version raises ValueError before any row is returned
+        return cls.rows(*cls.read_columns(file_name))
+
+    @classmethod
+    def read_columns(cls, file_name: str) -> tuple[dict, int]:
+        # columns by name and number of contacts
+        with open(file_name, "rb") as file:
+            data = memoryview(file.read())
+        if len(data) < cls.header.size:
+            raise ValueError(f"File '{file_name}' is too short for a phonebook")
+        magic, version, column_count, count, checksum = cls.header.unpack_from(data, 0)
+        if magic != cls.magic:
+            raise ValueError(f"File '{file_name}' is not a phonebook")
+        if version != cls.version:
+            raise ValueError(f"Phonebook '{file_name}' has version {version}, only version {cls.version} is supported")
+        if zlib.crc32(data[cls.header.size:]) != checksum:
+            raise ValueError(f"Phonebook '{file_name}' is damaged")
+        columns = {}
+        offset = cls.header.size
+        for (column, typecode), _ in zip(cls.columns, range(column_count)):
+            stored_typecode, itemsize, length = cls.column_header.unpack_from(data, offset)
+            offset += cls.column_header.size
+            items = array(typecode)
+            if stored_typecode != typecode.encode("ascii") or itemsize != items.itemsize:
+                raise ValueError(f"Column '{column}' of phonebook '{file_name}' has unsupported type")
+            items.frombytes(data[offset:offset + length])
+            if sys.byteorder == "big":
+                items.byteswap()
+            columns[column] = items
+            offset += length
+        return columns, count
+
+    @staticmethod
+    def rows(columns: dict, count: int):
+        names = columns["names"].tobytes().decode("utf-8")
+        keys = columns["keys"].tobytes().decode("utf-8") if len(columns["key lengths"]) else None
+        key_lengths = iter(columns["key lengths"])
+        phones = columns["phones"]
+        name_end = key_end = phones_end = 0
+        for name_length, phone_count, ordinal in zip(columns["name lengths"], columns["phone counts"],
+                                                    columns["birthdays"]):
+            name = names[name_end:name_end + name_length]
+            name_end += name_length
+            key = name
+            if keys is not None:
+                key_length = next(key_lengths)
+                key = keys[key_end:key_end + key_length]
+                key_end += key_length
+            numbers = [number if number >= 0 else None for number in phones[phones_end:phones_end + phone_count]]
+            phones_end += phone_count
+            yield key, name, numbers, ordinal or None
+
+
+class BinaryColumns:
+    # BinaryStore file for LazyRecords (the same interface as MappedStore): columns are read as they are, a row
+    # is decoded only when it is used; key is found by search in the string table of keys, states are rows
+    # (key, name, phone numbers, birthday ordinal or None)
+
+    def __init__(self, file_name: str):
+        self._columns, self.count = BinaryStore.read_columns(file_name)
+        self._names = self._columns["names"].tobytes().decode("utf-8")
+        self._keys = self._columns["keys"].tobytes().decode("utf-8") if len(self._columns["key lengths"]) else None
+        # end of every name and key in its string table, made on first search
+        self._name_ends = None
+        self._key_ends = None
+
+    def _ends(self) -> tuple[array, array]:
+        if self._name_ends is None:
+            self._name_ends = array("Q", accumulate(self._columns["name lengths"]))
+            self._key_ends = self._name_ends if self._keys is None \
+                else array("Q", accumulate(self._columns["key lengths"]))
+        return self._name_ends, self._key_ends
+
+    def _find(self, key) -> int | None:
+        # row of the key: place of the key in the string table must be the whole key of some row
+        if not isinstance(key, str) or len(key) == 0:
+            return None
+        keys = self._keys if self._keys is not None else self._names
+        key_ends = self._ends()[1]
+        position = keys.find(key)
+        while position != -1:
+            row = bisect_right(key_ends, position)
+            start = key_ends[row - 1] if row > 0 else 0
+            if start == position and key_ends[row] == position + len(key):
+                return row
+            position = keys.find(key, position + 1)
+        return None
+
+    def get(self, key):
+        row = self._find(key)
+        if row is None:
+            return None
+        name_ends = self._ends()[0]
+        name = self._names[name_ends[row - 1] if row > 0 else 0:name_ends[row]]
+        phones_start = sum(self._columns["phone counts"][:row])
+        phones = self._columns["phones"][phones_start:phones_start + self._columns["phone counts"][row]]
+        ordinal = self._columns["birthdays"][row]
+        return key, name, [number if number >= 0 else None for number in phones], ordinal or None
+
+    def __contains__(self, key) -> bool:
+        return self._find(key) is not None
+
+    def scan(self):
+        for row in BinaryStore.rows(self._columns, self.count):
+            yield row[0], row
+
+    def names(self):
+        keys = self._keys if self._keys is not None else self._names
+        end = 0
+        for length in self._columns["key lengths" if self._keys is not None else "name lengths"]:
+            yield keys[end:end + length]
+            end += length
+
+    def close(self):
+        pass
+
+
+class LazyRecords(MutableMapping):
+    # dict-like view over MappedStore or BinaryColumns: records are materialized by loader on first access,
+    # untouched ones are kept only while somebody references them, changed ones stay in memory
+
+    def __init__(self, store: MappedStore = None, loader=None):
+        self._store = store
+        self._loader = loader
+        self._cache = weakref.WeakValueDictionary()
+        self._changed = {}
+        self._extra = {}
+        self._deleted = set()
+
+    def _in_store(self, key) -> bool:
+        return self._store is not None and key not in self._deleted and key in self._store
+
+    def _materialize(self, key, state):
+        record = self._cache.get(key)
+        if record is None:
+            record = self._loader(state)
+            self._cache[key] = record
+        return record
+
+    def __getitem__(self, key):
+        if key in self._changed:
+            return self._changed[key]
+        record = self._cache.get(key)
+        if record is not None:
+            return record
+        if self._store is None or key in self._deleted:
+            raise KeyError(key)
+        state = self._store.get(key) if isinstance(key, str) else None
+        if state is None:
+            raise KeyError(key)
+        return self._materialize(key, state)
+
+    def __setitem__(self, key, record):
+        if key not in self._changed and not self._in_store(key):
+            self._extra[key] = None
+        self._changed[key] = record
+        self._cache.pop(key, None)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._changed.pop(key, None)
+        self._cache.pop(key, None)
+        self._extra.pop(key, None)
+        if self._store is not None and key in self._store:
+            self._deleted.add(key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._changed or self._in_store(key)
+
+    def __len__(self) -> int:
+        stored = self._store.count - len(self._deleted) if self._store is not None else 0
+        return stored + len(self._extra)
+
+    def __iter__(self):
+        if self._store is not None:
+            for name in self._store.names():
+                if name not in self._deleted:
+                    yield name
+        yield from list(self._extra)
+
+    def items(self):
+        if self._store is not None:
+            for name, state in self._store.scan():
+                if name in self._deleted:
+                    continue
+                if name in self._changed:
+                    yield name, self._changed[name]
+                else:
+                    yield name, self._materialize(name, state)
+        for name in list(self._extra):
+            yield name, self._changed[name]
+
+    def values(self):
+        return (record for _, record in self.items())
+
+    def close(self):
+        if self._store is not None:
+            self._store.close()
+
+
+class SqliteRecords(MutableMapping):
+    # dict-like view over sqlite database: every change is written through, records are materialized on access
+    schema = """
+        PRAGMA foreign_keys = ON;
+        PRAGMA journal_mode = WAL;
+        PRAGMA synchronous = NORMAL;
+        CREATE TABLE IF NOT EXISTS contacts (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            name_lower TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS phones (
+            contact_id INTEGER NOT NULL REFERENCES contacts(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            number INTEGER,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS birthdays (
+            contact_id INTEGER PRIMARY KEY REFERENCES contacts(id) ON DELETE CASCADE,
+            ordinal INTEGER NOT NULL,
+            month_day INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS contacts_name_lower ON contacts(name_lower);
+        CREATE INDEX IF NOT EXISTS phones_contact ON phones(contact_id, position);
+        CREATE INDEX IF NOT EXISTS phones_number ON phones(number);
+        CREATE INDEX IF NOT EXISTS birthdays_month_day ON birthdays(month_day);
+        CREATE VIRTUAL TABLE IF NOT EXISTS contacts_search USING fts5(name_lower, phones, tokenize = 'trigram');
+    """
+
+    def __init__(self, file_name: str, loader=None):
+        # connection could be used from worker threads of the server, which never write concurrently
+        self._connection = sqlite3.connect(file_name, check_same_thread=False)
+        self._connection.executescript(self.schema)
+        self._loader = loader
+        self._cache = weakref.WeakValueDictionary()
+        self._bulk = False
+
+    def _commit(self):
+        if not self._bulk:
+            self._connection.commit()
+
+    @contextmanager
+    def bulk(self):
+        # many changes in one transaction
+        self._bulk = True
+        try:
+            yield
+        finally:
+            self._bulk = False
+            self._connection.commit()
+
+    _select_records = (
+        "SELECT c.name, b.ordinal, "
+        "(SELECT json_group_array(number) FROM "
+        "(SELECT number FROM phones WHERE contact_id = c.id ORDER BY position)) "
+        "FROM contacts c LEFT JOIN birthdays b ON b.contact_id = c.id "
+    )
+
+    def _materialize(self, name: str, phones: list, ordinal):
+        record = self._cache.get(name)
+        if record is None:
+            record = self._loader({
+                "name": name,
+                "phone": phones,
+                "birthday": date.fromordinal(ordinal).isoformat() if ordinal is not None else None,
+            })
+            self._cache[name] = record
+        return record
+
+    def __getitem__(self, key):
+        record = self._cache.get(key)
+        if record is not None:
+            return record
+        row = self._connection.execute(self._select_records + "WHERE c.name = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        name, ordinal, phones = row
+        return self._materialize(name, json.loads(phones), ordinal)
+
+    def __setitem__(self, key, record):
+        execute = self._connection.execute
+        name_lower = str(key).lower()
+        contact_id, = execute(
+            "INSERT INTO contacts (name, name_lower) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET name_lower = excluded.name_lower RETURNING id",
+            (key, name_lower),
+        ).fetchone()
+        numbers = [phone._value for phone in record.phone]
+        values = [phone.value for phone in record.phone]
+        execute("DELETE FROM phones WHERE contact_id = ?", (contact_id,))
+        self._connection.executemany(
+            "INSERT INTO phones (contact_id, position, number, value) VALUES (?, ?, ?, ?)",
+            [(contact_id, position, number, value) for position, (number, value) in enumerate(zip(numbers, values))],
+        )
+        birthday = record.birthday.value if record.birthday is not None else None
+        if birthday is not None:
+            execute(
+                "INSERT OR REPLACE INTO birthdays (contact_id, ordinal, month_day) VALUES (?, ?, ?)",
+                (contact_id, birthday.toordinal(), birthday.month * 100 + birthday.day),
+            )
+        else:
+            execute("DELETE FROM birthdays WHERE contact_id = ?", (contact_id,))
+        execute("DELETE FROM contacts_search WHERE rowid = ?", (contact_id,))
+        execute(
+            "INSERT INTO contacts_search (rowid, name_lower, phones) VALUES (?, ?, ?)",
+            (contact_id, name_lower, " ".join(value for value in values if value is not None)),
+        )
+        self._cache[key] = record
+        self._commit()
+
+    def __delitem__(self, key):
+        row = self._connection.execute("SELECT id FROM contacts WHERE name = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        self._connection.execute("DELETE FROM contacts WHERE id = ?", row)
+        self._connection.execute("DELETE FROM contacts_search WHERE rowid = ?", row)
+        self._cache.pop(key, None)
+        self._commit()
+
+    def __contains__(self, key) -> bool:
+        return self._connection.execute("SELECT 1 FROM contacts WHERE name = ?", (key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT count(*) FROM contacts").fetchone()[0]
+
+    def __iter__(self):
+        for name, in self._connection.execute("SELECT name FROM contacts ORDER BY id"):
+            yield name
+
+    def items(self):
+        rows = self._connection.execute(self._select_records + "ORDER BY c.id")
+        for name, ordinal, phones in rows:
+            yield name, self._materialize(name, json.loads(phones), ordinal)
+
+    def values(self):
+        return (record for _, record in self.items())
+
+    def select_names(self, query: str, parameters=()) -> list:
+        return [name for name, in self._connection.execute(query, parameters)]
+
+    def index(self, index_class):
+        # indexed queries are answered by sqlite instead of indexes in memory, other indexes are built by book
+        sql_index = {
+            PatternIndex: SqlPatternIndex,
+            PhoneIndex: SqlPhoneIndex,
+            BirthdayIndex: SqlBirthdayIndex,
+        }.get(index_class)
+        return sql_index(self) if sql_index is not None else None
+
+    def close(self):
+        self._connection.commit()
+        self._connection.close()
+
+
+class SqlIndex:
+    # the database keeps itself up to date, so changes of book are ignored
+
+    def __init__(self, records: SqliteRecords):
+        self._records = records
+
+    def add(self, key, record):
+        pass
+
+    def discard(self, key):
+        pass
+
+
+class SqlPatternIndex(SqlIndex):
+
+    def search(self, pattern: str) -> tuple[list, bool]:
+        pattern = str(pattern)
+        if len(pattern) >= 3:
+            # trigram full text index gives candidates, AddressBook checks them with Record.match_pattern
+            phrase = '"' + pattern.replace('"', '""') + '"'
+            return self._records.select_names(
+                "SELECT c.name FROM contacts_search s JOIN contacts c ON c.id = s.rowid "
+                "WHERE contacts_search MATCH ? ORDER BY c.id",
+                (phrase,),
+            ), False
+        return self._records.select_names(
+            "SELECT name FROM contacts WHERE instr(name_lower, ?) > 0 "
+            "OR id IN (SELECT contact_id FROM phones WHERE instr(value, ?) > 0) ORDER BY id",
+            (pattern.lower(), pattern),
+        ), True
+
+
+class SqlPhoneIndex(SqlIndex):
+
+    def owners(self, number: int) -> set:
+        return set(self._records.select_names(
+            "SELECT c.name FROM phones p JOIN contacts c ON c.id = p.contact_id WHERE p.number = ?", (number,)
+        ))
+
+
+class SqlBirthdayIndex(SqlIndex):
+
+    def upcoming(self, days: int, today: date) -> list[tuple[int, str]]:
+        offsets = {}
+        for offset, buckets in calendar_walk(days, today):
+            for month, day in buckets:
+                offsets[month * 100 + day] = offset
+        if not offsets:
+            return []
+        rows = self._records._connection.execute(
+            "SELECT c.name, b.month_day FROM birthdays b JOIN contacts c ON c.id = b.contact_id "
+            f"WHERE b.month_day IN ({', '.join('?' * len(offsets))})",
+            list(offsets),
+        )
+        return sorted((offsets[month_day], name) for name, month_day in rows)
+
+
+class BookUnpickler(pickle.Unpickler):
+    # only classes of the phonebook could be loaded from pickle file, not any callable;
+    # books saved by main.py started as script refer to '__main__', others to 'main'
+    allowed = {
+        ("main", "Record"), ("main", "Name"), ("main", "Phone"), ("main", "Birthday"), ("main", "Field"),
+        ("datetime", "date"), ("copyreg", "_reconstructor"), ("builtins", "object"),
+    }
+
+    def find_class(self, module, name):
+        if module == "__main__":
+            module = "main"
+        if (module, name) not in self.allowed:
+            raise pickle.UnpicklingError(f"'{module}.{name}' is not allowed in phonebook")
+        if module == "main" and "main" not in sys.modules:
+            module = "__main__"
+        return super().find_class(module, name)
+
+
+class PickleStorage:
+    # whole book in one pickle file, changes between snapshots are kept in journal
+    file_name = "address_book.pickle"
+    journal_name = "address_book.journal"
+    lazy = False
+
+    def records(self, loader) -> MutableMapping:
+        return {}
+
+    def exists(self) -> bool:
+        return os.path.exists(self.file_name)
+
+    def open(self, loader) -> MutableMapping:
+        with open(self.file_name, "rb") as file:
+            return BookUnpickler(file).load()
+
+    def write(self, records: MutableMapping):
+        atomic_write(self.file_name, lambda file: pickle.dump(dict(records), file, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def close(self):
+        pass
+
+
+class BinaryStorage(PickleStorage):
+    # whole book in versioned columnar file (BinaryStore), changes between snapshots are kept in journal;
+    # records are made by loader from rows (key, name, phone numbers, birthday ordinal)
+    file_name = "address_book.bin"
+    journal_name = "address_book.bin.journal"
+
+    def open(self, loader) -> MutableMapping:
+        return {row[0]: loader(row) for row in BinaryStore.read(self.file_name)}
+
+    def open_lazy(self, loader) -> MutableMapping:
+        # records are made only when they are used, e.g. by one command from command line
+        return LazyRecords(BinaryColumns(self.file_name), loader=loader)
+
+    def write(self, records: MutableMapping):
+        BinaryStore.write(self.file_name, (
+            (
+                key,
+                record.name.value,
+                [phone._value for phone in record.phone],
+                record.birthday._value if record.birthday is not None else None,
+            )
+            for key, record in records.items()
+        ))
+
+
+class MappedStorage(PickleStorage):
+    # memory-mapped file, records are decoded only when they are used
+    file_name = "address_book.map"
+    journal_name = "address_book.map.journal"
+    lazy = True
+
+    def __init__(self):
+        self._records = None
+
+    def records(self, loader) -> MutableMapping:
+        return LazyRecords(loader=loader)
+
+    def open(self, loader) -> MutableMapping:
+        self._records = LazyRecords(MappedStore(self.file_name), loader=loader)
+        return self._records
+
+    def write(self, records: MutableMapping):
+        MappedStore.write(self.file_name, ((key, record.to_dict()) for key, record in records.items()))
+
+    def close(self):
+        if self._records is not None:
+            self._records.close()
+
+
+class SqliteStorage(PickleStorage):
+    # sqlite database, changes are written at once, so journal is not needed
+    file_name = "address_book.sqlite"
+    journal_name = None
+    lazy = True
+
+    def __init__(self):
+        self._records = None
+
+    def records(self, loader) -> MutableMapping:
+        return SqliteRecords(":memory:", loader=loader)
+
+    def open(self, loader) -> MutableMapping:
+        self._records = SqliteRecords(self.file_name, loader=loader)
+        return self._records
+
+    def write(self, records: MutableMapping):
+        if records is self._records:
+            self._records._connection.commit()
+            return
+        target = SqliteRecords(self.file_name)
+        with target.bulk():
+            for key, record in records.items():
+                target[key] = record
+        target.close()
+
+    def close(self):
+        if self._records is not None:
+            self._records.close()
+
+
+storages = {
+    "binary": BinaryStorage,
+    "pickle": PickleStorage,
+    "mapped": MappedStorage,
+    "sqlite": SqliteStorage,
+}
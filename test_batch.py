@@ -0,0 +1,133 @@
+import csv
+import json
+
+import pytest
+
+from batch import export_contacts, import_contacts, row_phones, validate_chunk
+from main import AddressBook, Birthday, Name, Phone, Record
+
+phone_inputs = [
+    "+380501234567",
+    "380501234567",
+    " +380501234567 ",
+    "+38 (050) 123-45-67",
+    "+38-050-123-45-67",
+    "(380) 50 123 45 67",
+    "+38050123456",
+    "+3805012345678",
+    "++380501234567",
+    "38+0501234567",
+    "+38050123456a",
+    "0501234567",
+    "+380\t501234567",
+    "+٣٨٠٥٠١٢٣٤٥٦٧",
+    "+48 123 456 789",
+]
+
+
+def contacts(book) -> dict:
+    return {key: record.to_dict() for key, record in book.data.items()}
+
+
+def test_phones_of_csv_cell_are_split_by_semicolon_and_comma():
+    assert row_phones({"phone": "+38 (050) 123-45-67"}) == ["+38 (050) 123-45-67"]
+    assert row_phones({"phone": "+38 (050) 123-45-67; +380671234567,+380931234567"}) \
+        == ["+38 (050) 123-45-67", " +380671234567", "+380931234567"]
+    assert row_phones({"phone": ["+380501234567"]}) == ["+380501234567"]
+    assert row_phones({"phone": ""}) == []
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_import_agrees_with_phone_value(workers, capsys):
+    with open("contacts.jsonl", "w", encoding="utf-8") as file:
+        for number, phone in enumerate(phone_inputs):
+            file.write(json.dumps({"name": f"Contact{number}", "phone": [phone]}) + "\n")
+
+    with AddressBook(history=0) as book:
+        imported, rejected, errors_file = import_contacts(book, "contacts.jsonl", workers=workers, chunk_size=4)
+        for number, phone in enumerate(phone_inputs):
+            expected = Phone(phone).value
+            record = book.data.get(f"Contact{number}")
+            if expected is None:
+                assert record is None, phone
+            else:
+                assert [phone.value for phone in record.phone] == [expected], phone
+    assert imported + rejected == len(phone_inputs)
+    assert imported == sum(Phone(phone).value is not None for phone in phone_inputs)
+
+
+def test_csv_import_of_spaced_phones(capsys):
+    with open("contacts.csv", "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["name", "phone", "birthday"])
+        writer.writerow(["Anna", "+38 (050) 123-45-67", "01-02-1990"])
+        writer.writerow(["Boris", "+38 (067) 123-45-67; +38 (093) 123-45-67", ""])
+
+    with AddressBook(history=0) as book:
+        assert import_contacts(book, "contacts.csv")[:2] == (2, 0)
+        assert [phone.value for phone in book.data["Anna"].phone] == ["+380501234567"]
+        assert [phone.value for phone in book.data["Boris"].phone] == ["+380671234567", "+380931234567"]
+
+
+@pytest.mark.parametrize("file_name", ["contacts.csv", "contacts.jsonl"])
+def test_export_and_import_give_the_same_book(file_name, directory, monkeypatch):
+    with AddressBook(history=0) as book:
+        book.add_new_contact(Name("Anna"), Phone("+38 (050) 123-45-67"), Birthday("01-02-1990"))
+        book.add_new_contact(Name("Boris"), Phone("+380671234567"))
+        book.data["Boris"].add_to_phone_field(Phone("+380931234567"))
+        book["Vira"] = Record(Name("Vira"), Phone("+380631234567"))
+        exported = contacts(book)
+        assert export_contacts(book, file_name) == 3
+
+    # a new book in other directory
+    (directory / "imported").mkdir()
+    monkeypatch.chdir(directory / "imported")
+    with AddressBook(history=0) as book:
+        imported, rejected, _ = import_contacts(book, str(directory / file_name))
+        assert (imported, rejected) == (3, 0)
+        assert contacts(book) == exported
+
+
+def test_chunk_without_phones():
+    assert [(line, error) for line, _, _, error in validate_chunk([(2, {"name": "Ivan"}), (3, {"name": "Anna"})])] \
+        == [(2, "contact has no phone"), (3, "contact has no phone")]
+    assert validate_chunk([]) == []
+
+
+def test_import_of_only_invalid_phone(capsys):
+    with open("contacts.csv", "w", encoding="utf-8", newline="") as file:
+        file.write("name,phone,birthday\nIvan,123,\n")
+
+    with AddressBook(history=0) as book:
+        imported, rejected, errors_file = import_contacts(book, "contacts.csv")
+    assert (imported, rejected) == (0, 1)
+    with open(errors_file, encoding="utf-8") as file:
+        assert json.loads(file.readline())["error"] == "'123' is not a phone number"
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_import_of_rows_with_scalar_phones(workers, capsys):
+    with open("contacts.jsonl", "w", encoding="utf-8") as file:
+        file.write('{"name": "Ivan", "phone": 380501112233}\n')
+        file.write('{"name": "Anna", "phone": true}\n')
+        file.write('{"name": "Boris", "phone": ["+380671234567"]}\n')
+        file.write('{"name": "Vira", "phone": {"mobile": "+380931234567"}}\n')
+
+    with AddressBook(history=0) as book:
+        imported, rejected, errors_file = import_contacts(book, "contacts.jsonl", workers=workers)
+        assert sorted(book.data) == ["Boris", "Ivan"]
+        assert [phone.value for phone in book.data["Ivan"].phone] == ["+380501112233"]
+    assert (imported, rejected) == (2, 2)
+    with open(errors_file, encoding="utf-8") as file:
+        assert [json.loads(line)["line"] for line in file] == [2, 4]
+
+
+def test_row_that_could_not_be_read_is_rejected():
+    class Broken:
+        def __str__(self):
+            raise RuntimeError("broken value")
+
+    rows = [(1, {"name": "Ivan", "phone": [Broken()]}), (2, {"name": "Anna", "phone": "+380501234567"})]
+    results = validate_chunk(rows)
+    assert [(line, state is None, error) for line, _, state, error in results] \
+        == [(1, True, "row could not be read: broken value"), (2, False, None)]
@@ -0,0 +1,66 @@
+from dedupe import find_duplicates, merge_duplicates, name_key
+from main import AddressBook, Birthday, Name, Phone, Record
+
+
+def book_of(*records) -> AddressBook:
+    book = AddressBook(journal=False, history=0)
+    for record in records:
+        book[record.name.value] = record
+    return book
+
+
+def test_name_key_ignores_order_case_and_alphabet():
+    assert name_key("Kovalenko Andrii") == name_key("andrii_kovalenko")
+    assert name_key("Ivan2") != name_key("Ivan22")
+
+
+def test_every_pair_is_compared_once():
+    names = ["Anna", "Boris", "Vira", "Ivan", "Olena", "Petro", "Taras"]
+    book = book_of(*(Record(Name(name), Phone(f"+38050123456{number}")) for number, name in enumerate(names)))
+    report = find_duplicates(book)
+    assert report.contacts == 7
+    assert 0 < report.comparisons <= 7 * 6 // 2
+    assert report.groups == []
+
+
+def test_duplicates_are_grouped():
+    book = book_of(
+        Record(Name("Kovalenko_andrii"), Phone("+380501234567"), Birthday("01-02-1990")),
+        Record(Name("Andrii_kovalenko"), Phone("+380501234567")),
+        Record(Name("Andrei_kovalenko"), Phone("+380671234567"), Birthday("01-02-1990")),
+        Record(Name("Olena_shevchenko"), Phone("+380931234567")),
+        Record(Name("Taras_bondarenko"), Phone("+380931234567")),
+    )
+    report = find_duplicates(book)
+    # contacts with birthday are kept first, then by name; a shared phone alone does not make duplicates
+    assert report.groups == [["Andrei_kovalenko", "Kovalenko_andrii", "Andrii_kovalenko"]]
+    assert report.reasons["Andrei_kovalenko"] in {"same name", "similar name and same birthday"}
+
+
+def test_contacts_with_different_birthdays_are_not_joined():
+    book = book_of(
+        Record(Name("Ivan_petrenko"), Phone("+380501234567"), Birthday("01-02-1990")),
+        Record(Name("Ivan_petrenko2"), Phone("+380501234567")),
+        Record(Name("Petrenko_ivan"), Phone("+380501234567"), Birthday("02-03-1991")),
+    )
+    report = find_duplicates(book)
+    assert len(report.groups) == 1
+    assert len(report.groups[0]) == 2
+
+
+def test_merge_duplicates():
+    book = book_of(
+        Record(Name("Kovalenko_andrii"), Phone("+380501234567")),
+        Record(Name("Andrii_kovalenko"), Phone("+380501234567"), Birthday("01-02-1990")),
+        Record(Name("Andrii_kovalenko_"), Phone("+380671234567")),
+    )
+    book["Andrii_kovalenko"].add_to_phone_field(Phone("+380931234567"))
+    report = find_duplicates(book)
+    assert report.groups == [["Andrii_kovalenko", "Andrii_kovalenko_", "Kovalenko_andrii"]]
+
+    assert merge_duplicates(book, report.groups + [["Gone", "Kovalenko_andrii"]]) == 2
+    assert list(book.data) == ["Andrii_kovalenko"]
+    kept = book.data["Andrii_kovalenko"]
+    assert [phone.value for phone in kept.phone] == ["+380501234567", "+380931234567", "+380671234567"]
+    assert kept.birthday.value.isoformat() == "1990-02-01"
+    assert find_duplicates(book).groups == []
@@ -0,0 +1,114 @@
+from history import History
+from main import AddressBook, Birthday, Name, Phone
+
+
+def contacts(book) -> dict:
+    return {key: record.to_dict() for key, record in book.data.items()}
+
+
+def phones(book, name: str) -> list:
+    return [phone.value for phone in book.data[name].phone]
+
+
+def test_undo_and_redo_of_add_change_and_delete():
+    with AddressBook(journal=False) as book:
+        with book.step("add contact"):
+            book.add_new_contact(Name("Anna"), Phone("+380501234567"))
+        added = contacts(book)
+        with book.step("change phone"):
+            record = book.data["Anna"]
+            record.change_in_phone_field(record.find_in_phone_field("+380501234567"), Phone("+380671234567"))
+        changed = contacts(book)
+        with book.step("delete contact"):
+            del book["Anna"]
+
+        assert book.undo()["command"] == "delete contact"
+        assert contacts(book) == changed
+        assert book.undo()["command"] == "change phone"
+        assert phones(book, "Anna") == ["+380501234567"]
+        assert book.undo()["command"] == "add contact"
+        assert contacts(book) == {}
+        assert book.undo() is None
+
+        assert book.redo()["command"] == "add contact"
+        assert contacts(book) == added
+        assert book.redo()["command"] == "change phone"
+        assert contacts(book) == changed
+        assert book.redo()["command"] == "delete contact"
+        assert "Anna" not in book.data
+        assert book.redo() is None
+
+
+def test_new_step_cuts_redo_chain():
+    with AddressBook(journal=False) as book:
+        book.add_new_contact(Name("Anna"), Phone("+380501234567"))
+        book.add_new_contact(Name("Boris"), Phone("+380671234567"))
+        book.undo()
+        assert "Boris" not in book.data
+
+        book.add_new_contact(Name("Vira"), Phone("+380931234567"))
+        assert book.redo() is None
+        assert sorted(book.data) == ["Anna", "Vira"]
+        book.undo()
+        book.undo()
+        assert list(book.data) == []
+
+
+def test_nested_steps_are_one_step():
+    with AddressBook(journal=False) as book:
+        with book.step("profile"):
+            book.add_new_contact(Name("Anna"), Phone("+380501234567"))
+            with book.step("add birthday"):
+                book.data["Anna"].add_to_birthday_field(Birthday("01-02-1990"))
+        step = book.undo()
+        assert step["command"] == "profile"
+        assert len(step["changes"]) == 2
+        assert list(book.data) == []
+
+
+def test_too_big_step_clears_history(monkeypatch):
+    monkeypatch.setattr(History, "max_step_changes", 2)
+    with AddressBook(journal=False) as book:
+        book.add_new_contact(Name("Anna"), Phone("+380501234567"))
+        with book.step("import"):
+            for name in ("Boris", "Vira", "Ivan"):
+                book.add_new_contact(Name(name), Phone("+380671234567"))
+        assert book.undo() is None
+        assert sorted(book.data) == ["Anna", "Boris", "Ivan", "Vira"]
+
+
+def test_history_is_kept_between_sessions():
+    with AddressBook(keep_history=True) as book:
+        book.add_new_contact(Name("Anna"), Phone("+380501234567"))
+        with book.step("add phone"):
+            book.data["Anna"].add_to_phone_field(Phone("+380671234567"))
+        book.add_new_contact(Name("Boris"), Phone("+380931234567"))
+        book.undo()
+
+    with AddressBook(keep_history=True) as book:
+        assert sorted(book.data) == ["Anna"]
+        assert [step["command"] for step, _ in book.history("Anna")] == [None, "add phone"]
+        assert book.redo() is not None
+        assert "Boris" in book.data
+        book.undo()
+        book.undo()
+        assert phones(book, "Anna") == ["+380501234567"]
+
+    with AddressBook(keep_history=True) as book:
+        assert phones(book, "Anna") == ["+380501234567"]
+        assert book.redo()["command"] == "add phone"
+        assert phones(book, "Anna") == ["+380501234567", "+380671234567"]
+
+
+def test_history_file_is_compacted(directory):
+    with AddressBook(journal=False, history=2, keep_history=True) as book:
+        for number in range(20):
+            book.add_new_contact(Name(f"Contact{number}"), Phone("+380501234567"))
+        file_name = book._storage.file_name + ".history"
+    with open(directory / file_name, encoding="utf-8") as file:
+        assert len(file.readlines()) <= 4 * 2
+
+    with AddressBook(journal=False, history=2, keep_history=True) as book:
+        assert book.undo()["changes"][0]["name"] == "Contact19"
+        assert book.undo()["changes"][0]["name"] == "Contact18"
+        assert book.undo() is None
@@ -0,0 +1,64 @@
+from datetime import date
+
+import pytest
+
+from indexes import days_to_birthday
+from main import AddressBook, Birthday, Name, Phone, Record
+
+birthdays = {
+    "Leap": "29-02-2000",
+    "March": "01-03-1985",
+    "February": "28-02-1970",
+    "Eve": "31-12-1990",
+    "January": "01-01-1991",
+}
+
+
+@pytest.fixture
+def book():
+    book = AddressBook(journal=False, history=0)
+    for name, birthday in birthdays.items():
+        book[name] = Record(Name(name), Phone("+380501234567"), Birthday(birthday))
+    return book
+
+
+@pytest.mark.parametrize("birthday, today, days", [
+    (date(2000, 2, 29), date(2023, 2, 27), 1),
+    (date(2000, 2, 29), date(2023, 2, 28), 0),
+    (date(2000, 2, 29), date(2023, 3, 1), 365),
+    (date(2000, 2, 29), date(2024, 2, 28), 1),
+    (date(2000, 2, 29), date(2024, 2, 29), 0),
+    (date(1970, 2, 28), date(2024, 2, 29), 365),
+    (date(1985, 3, 1), date(2024, 2, 28), 2),
+    (date(1990, 12, 31), date(2023, 12, 31), 0),
+    (date(1990, 12, 31), date(2024, 1, 1), 365),
+    (date(1991, 1, 1), date(2023, 12, 31), 1),
+])
+def test_days_to_birthday(birthday, today, days):
+    assert days_to_birthday(birthday, today) == days
+
+
+def test_record_days_to_birthday():
+    record = Record(Name("Leap"), Phone("+380501234567"), Birthday("29-02-2000"))
+    assert record.days_to_birthday(date(2023, 2, 28)) == 0
+    assert record.days_to_birthday() == days_to_birthday(date(2000, 2, 29), date.today())
+    assert Record(Name("Anna"), Phone("+380501234567")).days_to_birthday() is None
+
+
+@pytest.mark.parametrize("today, days, expected", [
+    (date(2023, 2, 27), 3, [(1, "February"), (1, "Leap"), (2, "March")]),
+    (date(2024, 2, 27), 3, [(1, "February"), (2, "Leap")]),
+    (date(2023, 12, 30), 3, [(1, "Eve"), (2, "January")]),
+    (date(2024, 3, 1), 1, [(0, "March")]),
+])
+def test_upcoming_birthdays(book, today, days, expected):
+    assert [(days_left, record.name.value) for days_left, record in book.upcoming_birthdays(days, today)] == expected
+
+
+@pytest.mark.parametrize("today", [
+    date(2023, 2, 28), date(2023, 3, 1), date(2023, 12, 31), date(2024, 1, 1), date(2024, 2, 29), date(2024, 12, 31),
+])
+def test_upcoming_birthdays_of_year_agree_with_days_to_birthday(book, today):
+    # every contact is found once, on the day of its next birthday
+    assert [(days_left, record.name.value) for days_left, record in book.upcoming_birthdays(366, today)] \
+        == sorted((record.days_to_birthday(today), key) for key, record in book.data.items())
@@ -0,0 +1,149 @@
+import pytest
+
+from main import AddressBook, Name, Phone, UserInputParser, build_commands_trie, parse_arguments, run
+
+
+@pytest.mark.parametrize("argv, command", [
+    (["phone", "Anna"], ["phone", "Anna"]),
+    (["show", "all", "--page", "1"], ["show", "all", "--page", "1"]),
+    (["show", "all", "--sort"], ["show", "all", "--sort"]),
+    (["dedupe", "--apply"], ["dedupe", "--apply"]),
+    (["--backend", "pickle"], []),
+])
+def test_command_keeps_its_options(argv, command):
+    assert parse_arguments(argv).command == command
+
+
+def test_options_before_command_belong_to_program():
+    arguments = parse_arguments(["--page-size", "2", "--backend", "pickle", "show", "all", "--page", "1"])
+    assert arguments.page_size == 2
+    assert arguments.backend == "pickle"
+    assert arguments.command == ["show", "all", "--page", "1"]
+
+
+def test_options_are_not_abbreviated():
+    with pytest.raises(SystemExit):
+        parse_arguments(["--page", "1", "show", "all"])
+
+
+def test_command_options_are_parsed_by_command():
+    assert UserInputParser().parse_user_input(" ".join(parse_arguments(["show", "all", "--page", "2"]).command)) \
+        == ("show all", [2, False])
+
+
+def test_one_shot_commands(capsys):
+    for name, number in (("Boris", "+380501234567"), ("Anna", "+380671234567"), ("Vira", "+380931234567")):
+        run(parse_arguments(["add", "contact", name, number]))
+    capsys.readouterr()
+
+    run(parse_arguments(["--page-size", "2", "show", "all", "--page", "1", "--sort"]))
+    output = capsys.readouterr().out
+    assert "Page 1 of 2" in output
+    assert output.index("Anna") < output.index("Boris")
+    assert "Vira" not in output
+
+    run(parse_arguments(["dedupe", "--apply"]))
+    assert "No duplicate contacts were found." in capsys.readouterr().out
+
+
+def test_unknown_one_shot_command_exits_with_error():
+    with pytest.raises(SystemExit) as error:
+        run(parse_arguments(["call", "Anna"]))
+    assert error.value.code == 2
+
+
+def test_unique_phones_option(capsys):
+    run(parse_arguments(["add", "contact", "Anna", "+380501234567"]))
+    run(parse_arguments(["--unique-phones", "add", "contact", "Boris", "+380501234567"]))
+    assert "already belongs to contact 'Anna'" in capsys.readouterr().out
+    run(parse_arguments(["add", "contact", "Boris", "+380501234567"]))
+    capsys.readouterr()
+
+    run(parse_arguments(["whois", "+380501234567"]))
+    assert "Anna, Boris" in capsys.readouterr().out
+
+
+def test_phone_owners_are_a_copy():
+    with AddressBook(history=0) as book:
+        book.add_new_contact(Name("Anna"), Phone("+380501234567"))
+        owners = book.phone_owners("+380501234567")
+        with pytest.raises(AttributeError):
+            owners.add("Boris")
+        book.add_new_contact(Name("Boris"), Phone("+380501234567"))
+        assert owners == {"Anna"}
+        assert book.phone_owners("+380501234567") == {"Anna", "Boris"}
+
+
+@pytest.mark.parametrize("user_input, parsed", [
+    # names that start with letters of the command keep them
+    ("add contact Daniel +380501234567", ("add contact", ["Daniel", "+380501234567"])),
+    ("add contact dan +380501234567 01-01-2000", ("add contact", ["Dan", "+380501234567", "01-01-2000"])),
+    ("add contact Contact +380501234567", ("add contact", ["Contact", "+380501234567"])),
+    ("delete contact Dale", ("delete contact", ["Dale"])),
+    ("days to birthday Daisy", ("days to birthday", ["Daisy"])),
+    ("add phone Hannah +380501234567", ("add phone", ["Hannah", "+380501234567"])),
+    ("phone Phoebe", ("phone", ["Phoebe"])),
+    ("PHONE anna", ("phone", ["Anna"])),
+    ("find phone", ("find", ["phone"])),
+    ("whois +38 050 123 45 67", ("whois", ["+38 050 123 45 67"])),
+])
+def test_command_and_its_arguments(user_input, parsed):
+    assert UserInputParser().parse_user_input(user_input) == parsed
+
+
+@pytest.mark.parametrize("user_input", ["phones Anna", "add Daniel +380501234567", "goodbye", "phone"])
+def test_unknown_command_or_missing_arguments(user_input, capsys):
+    assert isinstance(UserInputParser().parse_user_input(user_input), str)
+    assert "Incorrect input." in capsys.readouterr().out
+
+
+def test_longest_command_wins(monkeypatch):
+    monkeypatch.setattr(UserInputParser, "commands_trie", build_commands_trie({"phone", "phone book", "add"}))
+    assert UserInputParser.match_command(["phone", "Anna"]) == ("phone", ["Anna"])
+    assert UserInputParser.match_command(["Phone", "Book", "Anna"]) == ("phone book", ["Anna"])
+    assert UserInputParser.match_command(["phone", "bookkeeper"]) == ("phone", ["bookkeeper"])
+    with pytest.raises(ValueError):
+        UserInputParser.match_command(["phonebook", "Anna"])
+
+
+@pytest.mark.parametrize("name", ["'", "\"'\"", "-", "’"])
+def test_fuzzy_name_without_letters_is_rejected(name, capsys):
+    assert isinstance(UserInputParser().parse_user_input(f"fuzzy {name}"), str)
+    assert "Incorrect input." in capsys.readouterr().out
+
+
+def test_fuzzy_search_of_name_without_letters_finds_nothing():
+    with AddressBook(history=0) as book:
+        book.add_new_contact(Name("Al"), Phone("+380501234567"))
+        assert book.find_fuzzy("'") == []
+        assert [record.name.value for _, record in book.find_fuzzy("Ali")] == ["Al"]
+
+
+def test_invalid_phone_is_not_added_to_existing_contact(capsys):
+    run(parse_arguments(["add", "contact", "Anna", "+380501234567"]))
+    capsys.readouterr()
+    run(parse_arguments(["--answer", "yes", "add", "contact", "Anna", "12345"]))
+    output = capsys.readouterr().out
+    assert "Entered '12345' is not a phone number." in output
+    assert "added successfully" not in output
+
+    run(parse_arguments(["phone", "Anna"]))
+    output = capsys.readouterr().out
+    assert "+380501234567" in output and "None" not in output
+
+
+def test_read_only_command_does_not_convert_legacy_book(directory, capsys):
+    with AddressBook(journal=False, backend="pickle") as book:
+        book.add_new_contact(Name("Anna"), Phone("+380501234567"))
+    capsys.readouterr()
+
+    run(parse_arguments(["phone", "Anna"]))
+    output = capsys.readouterr().out
+    assert "+380501234567" in output
+    assert "Book was not changed." not in output
+    assert not (directory / "address_book.bin").exists()
+
+    run(parse_arguments(["add", "contact", "Boris", "+380671234567"]))
+    assert (directory / "address_book.bin").exists()
+    with AddressBook(backend="binary") as book:
+        assert sorted(book.data) == ["Anna", "Boris"]
@@ -0,0 +1,154 @@
+from datetime import date
+
+import pytest
+
+from benchmarks.contacts import synthetic_records
+from main import AddressBook, Birthday, Name, Phone, Record
+from shards import FetchedRecords, ShardedStorage
+from storage import Journal, storages
+
+
+def test_journal_replays_appended_entries():
+    journal = Journal("book.journal")
+    journal.append({"op": "put", "record": {"name": "Anna"}})
+    journal.append({"op": "delete", "name": "Anna"})
+    journal.close()
+
+    journal = Journal("book.journal")
+    assert list(journal.replay()) == [{"op": "put", "record": {"name": "Anna"}}, {"op": "delete", "name": "Anna"}]
+    assert journal.entries == 2
+
+
+def test_journal_torn_tail_is_cut_off_before_append(directory):
+    journal = Journal("book.journal")
+    journal.append({"op": "put", "record": {"name": "Anna"}})
+    journal.close()
+    with open("book.journal", "a", encoding="utf-8") as file:
+        file.write('{"op":"put","rec')
+
+    journal = Journal("book.journal")
+    assert list(journal.replay()) == [{"op": "put", "record": {"name": "Anna"}}]
+    journal.append({"op": "put", "record": {"name": "Boris"}})
+    journal.close()
+
+    assert [entry["record"]["name"] for entry in Journal("book.journal").replay()] == ["Anna", "Boris"]
+
+
+def test_journal_complete_entry_without_newline_is_torn():
+    with open("book.journal", "w", encoding="utf-8") as file:
+        file.write('{"op":"put","record":{"name":"Anna"}}\n{"op":"delete","name":"Anna"}')
+
+    assert list(Journal("book.journal").replay()) == [{"op": "put", "record": {"name": "Anna"}}]
+    with open("book.journal", encoding="utf-8") as file:
+        assert file.read() == '{"op":"put","record":{"name":"Anna"}}\n'
+
+
+def test_journal_torn_tail_of_pending_file_is_cut_off():
+    with open("book.journal.pending", "w", encoding="utf-8") as file:
+        file.write('{"op":"put","record":{"name":"Anna"}}\n{"op":"del')
+    with open("book.journal", "w", encoding="utf-8") as file:
+        file.write('{"op":"put","record":{"name":"Boris"}}\n')
+
+    journal = Journal("book.journal")
+    assert [entry["record"]["name"] for entry in journal.replay()] == ["Anna", "Boris"]
+    journal.rotate()
+    assert [entry["record"]["name"] for entry in Journal("book.journal").replay()] == ["Anna", "Boris"]
+
+
+def test_journal_replay_without_repair_keeps_file():
+    content = '{"op":"put","record":{"name":"Anna"}}\n{"op":"put","rec'
+    with open("book.journal", "w", encoding="utf-8") as file:
+        file.write(content)
+
+    assert len(list(Journal("book.journal").replay(repair=False))) == 1
+    with open("book.journal", encoding="utf-8") as file:
+        assert file.read() == content
+
+
+@pytest.mark.parametrize("backend", ["binary", "pickle", "mapped"])
+def test_book_keeps_changes_made_after_torn_tail(backend):
+    with AddressBook(backend=backend) as book:
+        book.add_new_contact(Name("Anna"), Phone("+380501234567"))
+        journal_name = book._storage.journal_name
+    # a crash in the middle of the next entry
+    with open(journal_name, "a", encoding="utf-8") as file:
+        file.write('{"op":"put","rec')
+
+    with AddressBook(backend=backend) as book:
+        book.add_new_contact(Name("Boris"), Phone("+380671234567"))
+    with AddressBook(backend=backend) as book:
+        assert sorted(book.data) == ["Anna", "Boris"]
+
+
+def test_read_only_book_does_not_cut_journal():
+    with AddressBook() as book:
+        book.add_new_contact(Name("Anna"), Phone("+380501234567"))
+        journal_name = book._storage.journal_name
+    # other session is writing the next entry
+    with open(journal_name, "a", encoding="utf-8") as file:
+        file.write('{"op":"put","rec')
+    with open(journal_name, encoding="utf-8") as file:
+        content = file.read()
+
+    with AddressBook(lazy=True, read_only=True) as book:
+        assert list(book.data) == ["Anna"]
+    with open(journal_name, encoding="utf-8") as file:
+        assert file.read() == content
+
+
+def book_state(book) -> dict:
+    # contacts and answers of the indexes
+    return {
+        "contacts": {key: record.to_dict() for key, record in book.data.items()},
+        "pattern": sorted(record.name.value for record in book.find_by_pattern("enko")),
+        "owners": sorted(book.phone_owners("+380501234567")),
+        "birthdays": [(days, record.name.value) for days, record in book.upcoming_birthdays(30, date(2024, 2, 20))],
+        "fuzzy": [(distance, record.name.value) for distance, record in book.find_fuzzy("Fedir_klimenko")],
+    }
+
+
+def test_storages_keep_the_same_book(directory, monkeypatch):
+    monkeypatch.setattr(ShardedStorage, "shards", 2)
+    records = synthetic_records(300)
+    states = {}
+    for backend in storages:
+        (directory / backend).mkdir()
+        monkeypatch.chdir(directory / backend)
+        with AddressBook(backend=backend, history=0) as book:
+            for key, record in records.items():
+                book[key] = record.copy()
+            book["Leap"] = Record(Name("Leap"), Phone("+380501234567"), Birthday("29-02-2000"))
+        with AddressBook(backend=backend, history=0) as book:
+            first, second = list(book.data)[:2]
+            del book[first]
+            book.data[second].add_to_phone_field(Phone("+380501234567"))
+            book.compact()
+        with AddressBook(backend=backend, history=0, lazy=True) as book:
+            states[backend] = book_state(book)
+
+    assert len(states["binary"]["contacts"]) == 300
+    assert all(states["binary"][query] for query in ("pattern", "owners", "birthdays", "fuzzy"))
+    assert set(states) >= {"binary", "pickle", "mapped", "sqlite", "sharded"}
+    for backend, state in states.items():
+        assert state == states["binary"], backend
+
+
+def test_sharded_answers_are_fetched_by_pages(monkeypatch):
+    monkeypatch.setattr(ShardedStorage, "shards", 2)
+    monkeypatch.setattr(FetchedRecords, "page_size", 2)
+    records = synthetic_records(50)
+    with AddressBook(history=0) as book:
+        for key, record in records.items():
+            book[key] = record.copy()
+        expected = [record.name.value for record in book.find_by_pattern("enko")]
+
+    # workers read their shards from the file of binary storage
+    with AddressBook(backend="sharded", history=0, read_only=True) as book:
+        assert len(book.data) == 50
+        answer = book.find_by_pattern("enko")
+        assert isinstance(answer, FetchedRecords)
+        assert sorted(record.name.value for record in answer) == sorted(expected)
+        assert answer[-1] is answer[len(answer) - 1]
+        assert [record.name.value for record in answer[1:4]] == [answer[position].name.value for position in (1, 2, 3)]
+        assert [days for days, _ in book.upcoming_birthdays(366, date(2024, 1, 1))] \
+            == sorted(days for days, _ in book.upcoming_birthdays(366, date(2024, 1, 1)))
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+import validators
+from validators import PhoneNormalizer
+
+numbers = [
+    "", "+", "380501234567", "+380501234567", " +380 50 123 45 67 ", "+38 (050) 123-45-67", " + 380501234567",
+    "++380501234567", "(+380)501234567", "3+80501234567", "+380501234567+", "+38050123456", "+3805012345678",
+    "+380501234567\0", "\0+380501234567", "\t+380501234567\n", "+38050\n1234567", "+380 50\t1234567",
+    "+٣٨٠٥٠١٢٣٤٥٦٧", "+380501234567é", "+48 123 456 789", "+1 (555) 123-4567", "+49 30 1234567", "x" * 100,
+    "3" * 40,
+]
+
+
+def random_numbers(count: int, seed: int = 0) -> list:
+    generator = random.Random(seed)
+    result = []
+    for _ in range(count):
+        if generator.random() < 0.5:
+            result.append("".join(generator.choice("0123456789+ ()-x\t") for _ in range(generator.randrange(16))))
+        else:
+            result.append(generator.choice(["", " ", "+", " +"]) + generator.choice(["380", "48", "1"])
+                          + "".join(generator.choice("0123456789 -()+") for _ in range(generator.randrange(6, 12))))
+    return result
+
+
+@pytest.mark.parametrize("plans", [None, {"380": 12, "48": 11, "1": 11}])
+def test_batch_agrees_with_normalize(plans):
+    normalizer = PhoneNormalizer(plans)
+    batch = numbers + random_numbers(5000)
+    expected = [normalizer.normalize(number) for number in batch]
+    assert normalizer.normalize_many(batch) == expected
+    if validators.batch_numpy() is not None:
+        assert normalizer.values(batch).tolist() == [int(number) if number else -1 for number in expected]
+
+
+@pytest.mark.parametrize("batch", [[], ["123"], ["abc", ""], ["+", " "], ["3801234567890123456"]])
+def test_small_batches(batch):
+    normalizer = PhoneNormalizer()
+    assert normalizer.normalize_many(batch) == [normalizer.normalize(number) for number in batch]
+    if validators.batch_numpy() is not None:
+        assert normalizer.values(batch).tolist() == [-1] * len(batch)
+
+
+def test_batch_without_numpy(monkeypatch):
+    monkeypatch.setattr(validators, "batch_numpy", lambda: None)
+    normalizer = PhoneNormalizer()
+    assert normalizer.normalize_many(["+38 (050) 123-45-67", "123"]) == ["380501234567", None]
+    assert normalizer.values(["+38 (050) 123-45-67", "123"]) == [380501234567, -1]
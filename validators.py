@@ -0,0 +1,136 @@
+from datetime import datetime, date
+
+# numpy is imported by the first batch (see batch_numpy), so commands that check one number do not wait for it
+numpy = None
+numpy_checked = False
+# country calling code (E.164 prefix) -> number of digits of the whole number with the prefix
+phone_plans = {"380": 12}
+
+# E.164 numbers have at most 15 digits, so they fit into int64 in the batch path
+max_phone_digits = 15
+
+
+def batch_numpy():
+    # numpy module or None when it is not installed
+    global numpy, numpy_checked
+    if not numpy_checked:
+        numpy_checked = True
+        try:
+            import numpy
+        except ImportError:
+            return None
+    return numpy
+
+
+class PhoneNormalizer:
+    # one set of rules for single numbers and for batches: whitespace around is stripped, leading "+" and
+    # "(", ")", "-", " " inside are dropped, the rest must be digits that start with a known prefix and have
+    # the length of its plan
+
+    def __init__(self, plans: dict = None):
+        self.plans = dict(plans if plans is not None else phone_plans)
+        # number length -> prefixes of plans with that length, so most invalid numbers are rejected by length
+        self._prefixes = {}
+        for prefix, length in self.plans.items():
+            self._prefixes[length] = (*self._prefixes.get(length, ()), prefix)
+
+    def normalize(self, number: str) -> str | None:
+        # returns digits of valid number or None; chain of str.replace is faster than translate or regex here
+        phone_number = (
+            number.strip()
+            .removeprefix("+")
+            .replace("(", "")
+            .replace(")", "")
+            .replace("-", "")
+            .replace(" ", "")
+        )
+        prefixes = self._prefixes.get(len(phone_number))
+        if prefixes is not None and phone_number.startswith(prefixes) and phone_number.isascii() \
+                and phone_number.isdigit():
+            return phone_number
+        return None
+
+    def normalize_many(self, numbers: list) -> list:
+        # the same as normalize for every number; with numpy all numbers are checked at once
+        if batch_numpy() is None:
+            return [self.normalize(number) for number in numbers]
+        normalized = numpy.full(len(numbers), None, dtype=object)
+        rows, digits = self._batch(numbers)
+        for length, (plan_rows, plan_digits) in digits.items():
+            normalized[plan_rows] = plan_digits.view(f"S{length}").ravel().astype(f"U{length}")
+        for row in rows:
+            normalized[row] = self.normalize(numbers[row])
+        return normalized.tolist()
+
+    def values(self, numbers: list):
+        # numpy array of numbers as integers (as Phone keeps them), -1 for invalid numbers; list without numpy
+        if batch_numpy() is None:
+            return [int(number) if number is not None else -1 for number in map(self.normalize, numbers)]
+        values = numpy.full(len(numbers), -1, dtype=numpy.int64)
+        rows, digits = self._batch(numbers)
+        for length, (plan_rows, plan_digits) in digits.items():
+            values[plan_rows] = (plan_digits - ord("0")).astype(numpy.int64) \
+                @ (numpy.int64(10) ** numpy.arange(length - 1, -1, -1))
+        for row in rows:
+            number = self.normalize(numbers[row])
+            values[row] = int(number) if number is not None else -1
+        return values
+
+    def _batch(self, numbers: list) -> tuple[list, dict]:
+        # rows left for normalize and {length: (rows, digits)} of valid numbers, digits as ascii codes.
+        # Numbers are joined into one buffer of lines and cleaned by bytes.translate and bytes.replace, which
+        # run in C over the whole batch: spaces are dropped, then "+" at the start of a line, then "(", ")", "-";
+        # numpy only finds line ends and lines with other characters than digits
+        if len(numbers) == 0:
+            return [], {}
+        text = "\n" + "\n".join(numbers) + "\n"
+        if not text.isascii() or text.count("\n") != len(numbers) + 1:
+            # such numbers are invalid or have whitespace around, "\1" leaves them for normalize
+            numbers = [number if number.isascii() and "\n" not in number else "\1" for number in numbers]
+            text = "\n" + "\n".join(numbers) + "\n"
+        data = text.encode("ascii").translate(None, b" ").replace(b"\n+", b"\n").translate(None, b"()-")
+        codes = numpy.frombuffer(data, dtype=numpy.uint8)
+        others = numpy.flatnonzero((codes - numpy.uint8(ord("0"))) > 9)
+        is_line_end = codes[others] == ord("\n")
+        line_ends = others[is_line_end]
+        starts = line_ends[:-1] + 1
+        lengths = line_ends[1:] - starts
+        valid = numpy.ones(len(numbers), dtype=bool)
+        rows = []
+        if len(line_ends) < len(others):
+            # lines with other characters are invalid; control characters (some of them are whitespace
+            # for str.strip) are left for normalize
+            wrong = others[~is_line_end]
+            wrong_rows = numpy.searchsorted(line_ends, wrong) - 1
+            valid[wrong_rows] = False
+            rows = numpy.unique(wrong_rows[codes[wrong] < ord(" ")]).tolist()
+        digits = {}
+        for length, prefixes in self._prefixes.items():
+            plan_rows = numpy.flatnonzero(valid & (lengths == length))
+            if len(plan_rows) == 0:
+                # the buffer could be shorter than the window of the plan
+                continue
+            plan_digits = numpy.lib.stride_tricks.sliding_window_view(codes, length)[starts[plan_rows]]
+            known = numpy.zeros(len(plan_rows), dtype=bool)
+            for prefix_length in {len(prefix) for prefix in prefixes if len(prefix) <= length}:
+                heads = numpy.ascontiguousarray(plan_digits[:, :prefix_length]).view(f"S{prefix_length}").ravel()
+                known |= numpy.isin(heads, [prefix.encode() for prefix in prefixes if len(prefix) == prefix_length])
+            digits[length] = (plan_rows[known], plan_digits[known])
+        return rows, digits
+
+phone_normalizer = PhoneNormalizer()
+
+
+def set_phone_plans(plans: dict):
+    # e.g. {"380": 12, "48": 11, "1": 11} to accept Ukrainian, Polish and North American numbers
+    global phone_normalizer
+    phone_normalizer = PhoneNormalizer(plans)
+
+
+def normalize_phone(number: str) -> str | None:
+    # returns digits of valid number ('380XXXXXXXXX' by default) or None
+    return phone_normalizer.normalize(number)
+
+
+def parse_birthday(value: str) -> date:
+    return datetime.strptime(value, "%d-%m-%Y").date()